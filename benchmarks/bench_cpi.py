@@ -0,0 +1,42 @@
+"""
+Benchmarks of loading CPI data and looking up values
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from rail import CPI
+
+from .generate import bls
+
+
+class CPISuite:
+    """
+    Benchmarks of loading CPI data and looking up values
+    """
+
+    def setup(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cu.data.1.AllItems")
+        with open(self.path, "w") as data:
+            data.write(bls())
+        self.cpi = CPI(path=self.path)
+        self.years = np.arange(1970, 2020)
+
+    def teardown(self):
+        self.directory.cleanup()
+
+    def time_load(self):
+        CPI(path=self.path)
+
+    def time_value(self):
+        for year in range(1970, 2020):
+            self.cpi.value(year, "CUUS0001SA0", "M01")
+
+    def time_value_array(self):
+        self.cpi.value(self.years, "CUUS0001SA0", "M01")
+
+    def time_inflation(self):
+        self.cpi.inflation(self.years, 2019)
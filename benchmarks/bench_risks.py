@@ -0,0 +1,81 @@
+"""
+Benchmarks of building and evaluating Risks
+"""
+
+from rail import Risks
+
+from .generate import register
+
+
+class RisksSuite:
+    """
+    Benchmarks of building and evaluating a register of Risks
+    """
+
+    params = [100, 1000, 10000]
+    param_names = ["risks"]
+
+    def setup(self, risks):
+        self.register = register(risks=risks, controls=max(risks // 20, 3))
+
+    def time_new(self, risks):
+        built = Risks()
+        for record in self.register["records"]:
+            built.new(*record)
+
+    def time_expected_loss_deterministic_mean(self, risks):
+        self.register["risks"].expected_loss_deterministic_mean()
+
+    def time_calculate_stochastic_risks(self, risks):
+        self.register["risks"].calculate_stochastic_risks(10000, rng=0)
+
+    def time_loss_histogram(self, risks):
+        self.register["risks"].loss_histogram(10000, rng=0)
+
+    def time_aggregate_distribution(self, risks):
+        self.register["risks"].aggregate_distribution(points=2**16)
+
+    def peakmem_calculate_stochastic_risks(self, risks):
+        self.time_calculate_stochastic_risks(risks)
+
+    def peakmem_loss_histogram(self, risks):
+        self.time_loss_histogram(risks)
+
+    def peakmem_aggregate_distribution(self, risks):
+        self.time_aggregate_distribution(risks)
+
+
+class OptimizeSuite:
+    """
+    Benchmarks of choosing which controls to implement
+    """
+
+    params = [4, 8]
+    param_names = ["controls"]
+
+    def setup(self, controls):
+        self.register = register(risks=200, controls=controls)
+
+    def time_determine_optimum_controls(self, controls):
+        self.register["risks"].determine_optimum_controls(
+            self.register["controls"], list(self.register["controls"])
+        )
+
+    def peakmem_determine_optimum_controls(self, controls):
+        self.time_determine_optimum_controls(controls)
+
+    def time_optimize_controls(self, controls):
+        self.register["risks"].optimize_controls(self.register["controls"])
+
+    def time_pareto_frontier(self, controls):
+        self.register["risks"].pareto_frontier(self.register["controls"])
+
+    def time_optimize_controls_within_budget(self, controls):
+        self.register["risks"].optimize_controls_within_budget(
+            self.register["controls"], self.register["controls"].costs() / 2
+        )
+
+    def time_sensitivity_test(self, controls):
+        self.register["risks"].sensitivity_test(
+            self.register["controls"], iterations=10, rng=0
+        )
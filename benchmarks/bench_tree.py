@@ -0,0 +1,55 @@
+"""
+Benchmarks of the Tree structure
+"""
+
+import random
+
+from rail import Tree
+
+from .generate import tree
+
+
+class TreeSuite:
+    """
+    Benchmarks of building and walking a deep Tree
+    """
+
+    params = [(4, 4), (8, 3)]
+    param_names = ["depth, branching"]
+
+    def setup(self, shape):
+        self.root, self.leaves = tree(*shape)
+        self.paths = [leaf.path() for leaf in self.leaves]
+
+    def time_add_child(self, shape):
+        tree(*shape)
+
+    def time_path(self, shape):
+        for leaf in self.leaves:
+            leaf._path = None
+            leaf.path()
+
+    def time_find(self, shape):
+        for path in self.paths:
+            self.root.find(path)
+
+
+class WideTreeSuite:
+    """
+    Benchmarks of adding many children to one node in shuffled order,
+    looking each up first as an import does
+    """
+
+    params = [5000, 20000]
+    param_names = ["children"]
+
+    def setup(self, children):
+        self.names = ["node %d" % child for child in range(children)]
+        random.Random(0).shuffle(self.names)
+
+    def time_add_child(self, children):
+        root = Tree("root")
+        for name in self.names:
+            if name not in root:
+                root.add_child(name)
+        list(root)
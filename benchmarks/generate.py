@@ -0,0 +1,111 @@
+"""
+Functions to generate synthetic registers and CPI data for the benchmarks
+"""
+
+import numpy as np
+
+from rail import (
+    Controls,
+    Impact,
+    Likelihood,
+    Risks,
+    ThreatEvents,
+    ThreatSources,
+    Tree,
+    Vulnerabilities,
+)
+
+
+def tree(depth: int, branching: int, name: str = "root") -> tuple:
+    """
+    A function to build a Tree of depth levels with branching children per
+    node, returning the root and its leaves
+    """
+    root = Tree(name)
+    leaves = [root]
+    for level in range(depth):
+        leaves = [
+            node.add_child("node %d.%d" % (level, child))
+            for node in leaves
+            for child in range(branching)
+        ]
+    return root, leaves
+
+
+def register(
+    threat_sources: int = 10,
+    threat_events: int = 100,
+    depth: int = 4,
+    branching: int = 4,
+    controls: int = 50,
+    risks: int = 1000,
+    controls_per_risk: int = 3,
+    seed: int = 0,
+) -> dict:
+    """
+    A function to generate a synthetic register: threat sources, threat
+    events spread over them, a system Tree, controls and risks that each
+    pair a random threat event and leaf system with a few random controls
+    """
+    rng = np.random.RandomState(seed)
+    sources = ThreatSources()
+    source_list = [sources.new("threat source %d" % i) for i in range(threat_sources)]
+    events = ThreatEvents()
+    event_list = [
+        events.new("threat event %d" % i, source_list[i % threat_sources])
+        for i in range(threat_events)
+    ]
+    root, leaves = tree(depth, branching)
+    control_set = Controls()
+    control_list = [
+        control_set.new("control %d" % i, rng.uniform(1e3, 1e5), rng.uniform(0.1, 0.9))
+        for i in range(controls)
+    ]
+    vulnerabilities = Vulnerabilities()
+    risk_set = Risks()
+    records = []
+    for i in range(risks):
+        chosen = rng.choice(
+            controls, size=min(controls_per_risk, controls), replace=False
+        )
+        vulnerability = vulnerabilities.new(
+            event_list[rng.randint(threat_events)],
+            leaves[rng.randint(len(leaves))],
+            [control_list[j] for j in chosen],
+        )
+        records.append(
+            (
+                vulnerability,
+                Likelihood(rng.uniform(0.01, 2)),
+                Impact("impact %d" % i, rng.uniform(8, 12), rng.uniform(0.5, 2)),
+            )
+        )
+    risk_set.extend(records)
+    return {
+        "threat_sources": sources,
+        "threat_events": events,
+        "systems": root,
+        "leaves": leaves,
+        "controls": control_set,
+        "vulnerabilities": vulnerabilities,
+        "risks": risk_set,
+        "records": records,
+    }
+
+
+def bls(series: int = 100, years: int = 50) -> str:
+    """
+    A function to generate monthly and semiannual CPI data from 1970 in the
+    format published by the BLS
+    """
+    periods = ["M%02d" % month for month in range(1, 13)] + ["S01", "S02"]
+    lines = ["series_id        \tyear\tperiod\t       value\tfootnote_codes"]
+    for i in range(series):
+        series_id = "CUUS%04dSA0" % i
+        for year in range(1970, 1970 + years):
+            for j, period in enumerate(periods):
+                lines.append(
+                    "%-17s\t%d\t%s\t%11.3f\t"
+                    % (series_id, year, period, 100 + year - 1970 + j / 100)
+                )
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,73 @@
+"""
+A benchmark of the lognormal samplers: scipy's lognorm.ppf against the
+exp of normals used by plain sampling and the ndtri inverse CDF used by the
+other sampling strategies, and of total_loss against sampling every risk
+with lognorm.ppf and scipy's Poisson inverse CDF
+
+Run it from the repository root with python -m benchmarks.lognormal
+"""
+
+import argparse
+import time
+
+import numpy as np
+from scipy.special import ndtri
+from scipy.stats import lognorm, poisson
+
+from rail.sampling import total_loss
+
+
+def best(function, repeat: int) -> float:
+    """
+    Return the fastest of repeat runs of function in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--risks", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    lam = rng.uniform(0.01, 1, args.risks)
+    mu = rng.normal(10, 1, args.risks)
+    sigma = rng.uniform(0.5, 2, args.risks)
+    shape = (args.risks, args.iterations)
+    mu_column, sigma_column = mu[:, np.newaxis], sigma[:, np.newaxis]
+    cases = {
+        "lognorm.ppf": lambda: lognorm.ppf(
+            rng.random(shape), s=sigma_column, scale=np.exp(mu_column)
+        ),
+        "exp(ndtri)": lambda: np.exp(
+            mu_column + sigma_column * ndtri(rng.random(shape))
+        ),
+        "exp(normal)": lambda: np.exp(
+            mu_column + sigma_column * rng.standard_normal(shape)
+        ),
+    }
+    cases["scipy lognorm+poisson"] = lambda: (
+        lognorm.ppf(rng.random(shape), s=sigma_column, scale=np.exp(mu_column))
+        * poisson.ppf(rng.random(shape), lam[:, np.newaxis])
+    ).sum(axis=0)
+    for sampling in ["plain", "inverse", "lhs", "sobol"]:
+        cases["total_loss %s" % sampling] = lambda sampling=sampling: total_loss(
+            lam, mu, sigma, args.iterations, rng=rng, sampling=sampling
+        )
+    print("%d risks x %d iterations" % shape)
+    baseline = {}
+    for name, function in cases.items():
+        seconds = best(function, args.repeat)
+        group = "total" if name.startswith(("scipy", "total")) else "lognormal"
+        baseline.setdefault(group, seconds)
+        print("%-24s %8.3f s %6.1fx" % (name, seconds, baseline[group] / seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+A runner for the benchmark suites, which records the best time and the peak
+memory allocated by every benchmark and compares them with a saved run
+
+The suites follow asv's conventions: classes in the bench_*.py modules with
+setup and teardown methods, time_* benchmarks and optional params. Run them
+from the repository root with
+
+    python -m benchmarks.run --save results.json
+    python -m benchmarks.run --compare results.json
+
+The comparison exits with status 1 if any benchmark got slower or used more
+memory than the threshold allows.
+"""
+
+import argparse
+import importlib
+import itertools
+import json
+import pkgutil
+import re
+import sys
+import time
+import tracemalloc
+
+import benchmarks
+
+
+def suites() -> list:
+    """
+    Return the benchmark classes of every bench_*.py module
+    """
+    classes = []
+    for module in pkgutil.iter_modules(benchmarks.__path__):
+        if module.name.startswith("bench_"):
+            imported = importlib.import_module("benchmarks." + module.name)
+            classes.extend(
+                value
+                for name, value in vars(imported).items()
+                if isinstance(value, type)
+                and value.__module__ == imported.__name__
+                and name.endswith("Suite")
+            )
+    return classes
+
+
+def cases(pattern: str = "") -> list:
+    """
+    Return a (name, class, method, params) case for every benchmark and
+    combination of params whose name matches pattern
+    """
+    found = []
+    for suite in suites():
+        params = getattr(suite, "params", [])
+        if params and not isinstance(params[0], list):
+            params = [params]
+        for method in sorted(name for name in dir(suite) if name.startswith("time_")):
+            for combination in itertools.product(*params):
+                name = "%s.%s.%s" % (
+                    suite.__module__.split(".")[-1],
+                    suite.__name__,
+                    method,
+                )
+                if combination:
+                    name += "(%s)" % ", ".join(map(repr, combination))
+                if re.search(pattern, name):
+                    found.append((name, suite, method, combination))
+    return found
+
+
+def measure(suite, method: str, params: tuple, repeat: int) -> dict:
+    """
+    Return the best time in seconds of repeat runs of a benchmark and the
+    peak memory in bytes allocated by one more run
+    """
+    instance = suite()
+    if hasattr(instance, "setup"):
+        instance.setup(*params)
+    try:
+        function = getattr(instance, method)
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function(*params)
+            times.append(time.perf_counter() - start)
+        tracemalloc.start()
+        function(*params)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    finally:
+        if hasattr(instance, "teardown"):
+            instance.teardown(*params)
+    return {"seconds": min(times), "peak_bytes": peak}
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """
+    Return the names of the benchmarks that are more than threshold times
+    slower or larger than in baseline
+    """
+    return [
+        name
+        for name, result in results.items()
+        if name in baseline
+        and any(
+            result[key] > threshold * max(baseline[name][key], 1e-9)
+            for key in ("seconds", "peak_bytes")
+        )
+    ]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--filter", default="", help="regex of benchmarks to run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save", help="write the results to a JSON file")
+    parser.add_argument("--compare", help="compare with results in a JSON file")
+    parser.add_argument("--threshold", type=float, default=1.5)
+    args = parser.parse_args(argv)
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as saved:
+            baseline = json.load(saved)["results"]
+    results = {}
+    for name, suite, method, params in cases(args.filter):
+        results[name] = measure(suite, method, params, args.repeat)
+        line = "%-70s %10.4f s %10.1f MiB" % (
+            name,
+            results[name]["seconds"],
+            results[name]["peak_bytes"] / 2**20,
+        )
+        if name in baseline:
+            line += " %6.2fx" % (
+                results[name]["seconds"] / max(baseline[name]["seconds"], 1e-9)
+            )
+        print(line, flush=True)
+    if args.save:
+        with open(args.save, "w") as saved:
+            json.dump(
+                {"python": sys.version, "time": time.time(), "results": results},
+                saved,
+                indent=1,
+            )
+    regressions = compare(results, baseline, args.threshold)
+    for name in regressions:
+        print("regression: %s" % name)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,14 @@
+from .aggregate import AggregateDistribution
 from .control import Control, Controls
 from .cpi import CPI
 from .impact import Impact
 from .likelihood import Likelihood
+from .optimizer import Optimizer
+from .profiling import Profiler
 from .threat_event import ThreatEvent, ThreatEvents
 from .threat_source import ThreatSource, ThreatSources
 from .tree import Tree
 from .risk import Risk, Risks
+from .sketch import LossHistogram
+from .register import RiskRegister
 from .vulnerability import Vulnerability, Vulnerabilities
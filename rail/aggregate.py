@@ -0,0 +1,270 @@
+"""
+A class to compute the aggregate loss distribution of many risks without
+sampling
+"""
+
+import numpy as np
+
+LEVEL_RATIO = 2**8
+LOG_POINTS = 8192
+SIGMA_DECIMALS = 3
+
+
+class AggregateDistribution:
+    """
+    A class to compute the aggregate loss distribution of many risks without
+    sampling
+
+    Every risk is a compound Poisson loss with a lognormal severity, so their
+    sum is one compound Poisson loss whose rate is the sum of the rates and
+    whose severity is the mixture of the severities weighted by rate. The
+    mixture is discretized on a grid of points losses spaced step apart, and
+    the aggregate probabilities follow from its characteristic function with
+    an FFT. The grid is exponentially tilted to stop probability beyond the
+    end of the grid wrapping around to the start.
+
+    One grid reaching the far tail of a heavy tailed risk is too coarse for
+    the bulk of the losses, so grids are laid on levels, each LEVEL_RATIO
+    times shorter than the one above, until the losses below a level have a
+    probability under tail. Below the end of a grid a shorter grid is exact:
+    the aggregate is at most a loss below the end only if no single loss
+    reaches the end, which is what the lumped tail of the severity gives.
+    Each level supplies the losses from half its own end down to half the
+    end of the level below, so every loss is read from a grid with at least
+    points / (2 * LEVEL_RATIO) steps below it.
+    """
+
+    def __init__(
+        self,
+        lam,
+        mu,
+        sigma,
+        points: int = 2**18,
+        upper: float = None,
+        tail: float = 1e-6,
+    ) -> None:
+        lam = np.asarray(lam, dtype=float).ravel()
+        mu = np.broadcast_to(np.asarray(mu, dtype=float), lam.shape)
+        sigma = np.broadcast_to(np.asarray(sigma, dtype=float), lam.shape)
+        positive = lam > 0
+        severities, inverse = np.unique(
+            np.stack([mu[positive], sigma[positive]], axis=1),
+            axis=0,
+            return_inverse=True,
+        )
+        rates = np.bincount(
+            inverse.ravel(), weights=lam[positive], minlength=len(severities)
+        )
+        mu, sigma = severities[:, 0], severities[:, 1]
+        self.rates, self.mu, self.sigma = rates, mu, sigma
+        self.rate = float(rates.sum())
+        if upper is None:
+            upper = self._upper(rates, mu, sigma, tail)
+        upper = float(upper)
+        end = upper
+        losses, cdf_values = [], []
+        while True:
+            step = upper / (points - 1) if upper > 0 else 1.0
+            grid = np.arange(points) * step
+            cdf = np.cumsum(self._convolve(self._severity(rates, mu, sigma, grid)))
+            if not losses:
+                cdf /= cdf[-1]
+            lower = upper / (2 * LEVEL_RATIO)
+            last = (
+                lower == 0
+                or cdf[int(lower / step)] < tail
+                or self.rate - _rate_above(rates, mu, sigma, np.log(lower)) < tail
+            )
+            keep = grid <= end if last else (grid > lower) & (grid <= end)
+            losses.append(grid[keep])
+            cdf_values.append(np.minimum(cdf[keep], 1))
+            if last:
+                break
+            upper, end = upper / LEVEL_RATIO, lower
+        self.losses = np.concatenate(losses[::-1])
+        self.cdf_values = np.maximum.accumulate(np.concatenate(cdf_values[::-1]))
+        self.pmf = np.diff(self.cdf_values, prepend=0)
+
+    def _upper(self, rates, mu, sigma, tail: float) -> float:
+        """
+        The loss that the aggregate exceeds with probability about tail, where
+        the largest single loss dominates, found by bisection in log space,
+        and at least far enough beyond the mean to cover the tail of the
+        count when severities are light or fixed
+        """
+        from scipy.special import ndtri
+
+        if self.rate == 0:
+            return 0.0
+        mean = rates @ np.exp(mu + sigma**2 / 2)
+        low, high = np.log(mean), np.log(mean) + 1
+        while _rate_above(rates, mu, sigma, high) > tail:
+            low, high = high, 2 * high - low
+        for _ in range(50):
+            middle = (low + high) / 2
+            if _rate_above(rates, mu, sigma, middle) > tail:
+                low = middle
+            else:
+                high = middle
+        deviation = np.sqrt(rates @ np.exp(2 * mu + 2 * sigma**2))
+        return max(np.exp(high), 2 * mean, mean + 2 * ndtri(1 - tail) * deviation)
+
+    def _severity(self, rates, mu, sigma, losses) -> np.ndarray:
+        """
+        The mixture severity discretized onto the evenly spaced losses so that
+        its mean is kept. The probability and mean of each step between grid
+        points are split between its two ends.
+        """
+        points = len(losses)
+        if self.rate == 0:
+            return np.zeros(points)
+        step = losses[1]
+        log_losses = np.log(losses[1:])
+        fine = np.linspace(log_losses[0], log_losses[-1], LOG_POINTS)
+        cdf, moment = _mixture(fine, rates, mu, sigma)
+        cdf = np.maximum.accumulate(np.append(0, np.interp(log_losses, fine, cdf)))
+        moment = np.maximum.accumulate(
+            np.append(0, np.interp(log_losses, fine, moment))
+        )
+        cdf, moment = cdf / self.rate, moment / self.rate
+        mass, first = np.diff(cdf), np.diff(moment)
+        upper = np.clip((first - losses[:-1] * mass) / step, 0, mass)
+        severity = np.zeros(points)
+        severity[:-1] += mass - upper
+        severity[1:] += upper
+        severity[-1] += max(1 - severity.sum(), 0)
+        return severity
+
+    def _convolve(self, severity) -> np.ndarray:
+        """
+        The aggregate probabilities on the grid of the severity, which are
+        short of 1 by the probability of a total beyond the end of the grid
+        """
+        points = len(severity)
+        theta = 20 / points
+        tilt = np.exp(-theta * np.arange(points))
+        transform = np.fft.rfft(severity * tilt)
+        pmf = np.fft.irfft(np.exp(self.rate * (transform - 1)), n=points) / tilt
+        return np.maximum(pmf, 0)
+
+    def mean(self) -> float:
+        """
+        A method to return the mean loss, exactly rather than from the grid,
+        which misses losses beyond its end
+        """
+        return float(self.rates @ np.exp(self.mu + self.sigma**2 / 2))
+
+    def variance(self) -> float:
+        """
+        A method to return the variance of the losses, exactly rather than
+        from the grid
+        """
+        return float(self.rates @ np.exp(2 * self.mu + 2 * self.sigma**2))
+
+    def cdf(self, loss):
+        """
+        A method to return the probability that the loss is at most a value,
+        or an array of values
+        """
+        loss = np.asarray(loss, dtype=float)
+        middles = (self.losses[1:] + self.losses[:-1]) / 2
+        index = np.searchsorted(middles, loss, side="right")
+        value = np.where(loss < 0, 0.0, self.cdf_values[index])
+        return value if value.ndim else float(value)
+
+    def exceedance(self, loss):
+        """
+        A method to return the probability that the loss exceeds a value, or
+        an array of values
+        """
+        return 1 - self.cdf(loss)
+
+    def exceedance_curve(self) -> tuple:
+        """
+        A method to return the loss exceedance curve as arrays of losses and
+        the probability that each is exceeded
+        """
+        return self.losses, 1 - self.cdf_values
+
+    def quantile(self, q):
+        """
+        A method to return the loss at quantile q, or at an array of quantiles
+        """
+        index = np.searchsorted(self.cdf_values, q)
+        value = self.losses[np.minimum(index, len(self.losses) - 1)]
+        return value if np.ndim(value) else float(value)
+
+    def value_at_risk(self, q: float = 0.99) -> float:
+        """
+        A method to return the value at risk, the loss at quantile q
+        """
+        return self.quantile(q)
+
+    def tail_value_at_risk(self, q: float = 0.99) -> float:
+        """
+        A method to return the tail value at risk, the mean loss in the worst
+        1 - q of outcomes, taking the losses beyond the end of the grid from
+        the exact mean
+        """
+        index = min(int(np.searchsorted(self.cdf_values, q)), len(self.pmf) - 1)
+        below = self.pmf[: index + 1] @ self.losses[: index + 1]
+        within = (self.cdf_values[index] - q) * self.losses[index]
+        return float((self.mean() - below + within) / (1 - q))
+
+
+def _rate_above(rates, mu, sigma, log_loss) -> float:
+    """
+    The rate of single losses above exp(log_loss)
+    """
+    from scipy.special import ndtr
+
+    fixed = sigma == 0
+    scale = np.where(fixed, 1, sigma)
+    return rates @ np.where(fixed, mu > log_loss, ndtr((mu - log_loss) / scale))
+
+
+def _mixture(fine, rates, mu, sigma) -> tuple:
+    """
+    The rate weighted sums of the lognormal CDFs and partial first moments
+    E[X; log X <= t] at every log loss t in the evenly spaced array fine.
+    Risks with the same sigma, after rounding to SIGMA_DECIMALS, share one
+    kernel: their mus are binned onto the spacing of fine and convolved with
+    it, so the cost grows with the number of distinct sigmas, not of risks.
+    Risks with a sigma of 0 have a fixed loss, a step in the CDF at their mu.
+    """
+    from scipy.signal import fftconvolve
+    from scipy.special import ndtr
+
+    spacing = fine[1] - fine[0]
+    cdf = np.zeros(len(fine))
+    moment = np.zeros(len(fine))
+    sigma = np.round(sigma, SIGMA_DECIMALS)
+    for value in np.unique(sigma):
+        group = sigma == value
+        if value == 0:
+            steps = np.searchsorted(fine, mu[group])
+            for total, weights in (
+                (cdf, rates[group]),
+                (moment, rates[group] * np.exp(mu[group])),
+            ):
+                total += np.bincount(steps, weights=weights, minlength=len(fine) + 1)[
+                    : len(fine)
+                ].cumsum()
+            continue
+        reach = int(np.ceil(9 * value / spacing)) + 1
+        index = np.clip(
+            np.rint((mu[group] - fine[0]) / spacing).astype(np.int64),
+            -reach,
+            len(fine) + reach,
+        )
+        low, high = index.min(), index.max()
+        offsets = np.arange(-high, len(fine) - low) * spacing / value
+        for total, weights, shift in (
+            (cdf, rates[group], 0.0),
+            (moment, rates[group] * np.exp(mu[group] + value**2 / 2), value),
+        ):
+            binned = np.bincount(index - low, weights=weights)
+            total += fftconvolve(binned, ndtr(offsets - shift))[
+                high - low : high - low + len(fine)
+            ]
+    return cdf, moment
@@ -5,7 +5,8 @@ A class to represent Controls
 from collections import UserDict
 
 import numpy as np
-from scipy.stats import lognorm
+
+from .sampling import get_rng, uniforms
 
 
 class Control(UserDict):
@@ -21,14 +22,25 @@ class Control(UserDict):
         self.data["cost"] = cost
         self.data["reduction"] = reduction
         self.data["implemented"] = implemented
+        self.version = 0
+
+    def __setitem__(self, key: str, value) -> None:
+        self.data[key] = value
+        self.version += 1
 
-    def evaluate_lognormal(self, iterations=1):
+    def evaluate_lognormal(self, iterations=1, rng=None, sampling="plain"):
+        from scipy.special import ndtri
+
+        rng = get_rng(rng)
+        if sampling == "plain":
+            cost = rng.standard_normal(iterations)
+            reduction = rng.standard_normal(iterations)
+        else:
+            cost, reduction = ndtri(uniforms(2, iterations, sampling, rng))
         return Control(
             name=self.data["name"],
-            cost=lognorm.ppf(np.random.rand(iterations), s=np.log(self.data["cost"])),
-            reduction=lognorm.ppf(
-                np.random.rand(iterations), s=np.log(self.data["reduction"])
-            ),
+            cost=np.exp(np.log(self.data["cost"]) * cost),
+            reduction=np.exp(np.log(self.data["reduction"]) * reduction),
             implemented=self.data["implemented"],
         )
 
@@ -48,10 +60,19 @@ class Controls(UserDict):
         self.data[name] = Control(name, cost, reduction)
         return self.data[name]
 
-    def costs(self):
+    def costs(self, drawn=None):
         """
-        A method to compute the deterministic costs of implemented controls in a Controls class
+        A method to compute the deterministic costs of implemented controls in a Controls class,
+        or their costs in drawn, a dict of cost by control name, if given
         """
+        if drawn is not None:
+            return np.sum(
+                [
+                    drawn[name]
+                    for name, control in self.data.items()
+                    if control["implemented"] is True
+                ]
+            )
         return np.sum(
             list(
                 map(
@@ -61,17 +82,29 @@ class Controls(UserDict):
             )
         )
 
-    def costs_lognormal(self):
+    def draw_costs_lognormal(self, rng=None):
+        """
+        A method to draw one stochastic cost for every control in a Controls class,
+        returned as a dict of cost by control name
+        """
+        rng = get_rng(rng)
+        return {
+            name: control.evaluate_lognormal(rng=rng).data["cost"][0]
+            for name, control in self.data.items()
+        }
+
+    def costs_lognormal(self, rng=None):
         """
         A method to compute the stochastic costs of implemented controls in a Controls class
         """
+        rng = get_rng(rng)
         return np.sum(
             list(
                 map(
-                    lambda x: x.evaluate_lognormal().data["cost"]
+                    lambda x: x.evaluate_lognormal(rng=rng).data["cost"][0]
                     if x.data["implemented"] is True
                     else 0,
-                    self,
+                    self.data.values(),
                 )
             )
         )
@@ -1,31 +1,114 @@
 """
 A class to retrieve United States CPI data and calculate inflation
 """
-import pandas as pd
+import os
+import time
+
+import numpy as np
+
+URL = "https://download.bls.gov/pub/time.series/cu/cu.data.0.Current"
+CACHE = os.path.join(os.path.expanduser("~"), ".cache", "rail", "cpi.npz")
 
 
 class CPI:
     """
     A class to retrieve United States CPI data and calculate inflation
+
+    The data is read from path if given, either a BLS time series file or a
+    snapshot written by save. Otherwise it is read from the snapshot at cache,
+    which is downloaded from the BLS again once it is older than max_age
+    seconds. A stale cache is still used if the download fails.
     """
 
-    def __init__(self) -> None:
-        url = "https://download.bls.gov/pub/time.series/cu/cu.data.0.Current"
-        self.cpi = pd.read_csv(url, sep="\t", skipinitialspace=True)
-        self.cpi.columns = [c.replace(" ", "") for c in self.cpi.columns]
+    def __init__(
+        self,
+        path: str = None,
+        cache: str = CACHE,
+        max_age: float = 30 * 24 * 60 * 60,
+        refresh: bool = False,
+    ) -> None:
+        if path is not None:
+            columns = self._read(path)
+        elif cache is None:
+            columns = self._read(URL)
+        else:
+            fresh = (
+                os.path.exists(cache)
+                and time.time() - os.path.getmtime(cache) < max_age
+            )
+            if fresh and not refresh:
+                columns = self._read(cache)
+            else:
+                try:
+                    columns = self._read(URL)
+                except OSError:
+                    if not os.path.exists(cache):
+                        raise
+                    columns = self._read(cache)
+                else:
+                    os.makedirs(os.path.dirname(cache) or ".", exist_ok=True)
+                    self._write(cache, columns)
+        self.columns = columns
+        self.index = dict(
+            zip(
+                zip(
+                    columns["series_id"].tolist(),
+                    columns["year"].tolist(),
+                    columns["period"].tolist(),
+                ),
+                columns["value"].tolist(),
+            )
+        )
+
+    @property
+    def cpi(self):
+        """
+        The CPI data as a DataFrame
+        """
+        import pandas as pd
+
+        return pd.DataFrame(self.columns)
+
+    @staticmethod
+    def _read(path: str) -> dict:
+        if str(path).endswith(".npz"):
+            with np.load(path) as snapshot:
+                return {name: snapshot[name] for name in snapshot.files}
+        import pandas as pd
+
+        cpi = pd.read_csv(path, sep="\t", skipinitialspace=True)
+        cpi.columns = [c.replace(" ", "") for c in cpi.columns]
+        return {
+            "series_id": cpi["series_id"].str.strip().to_numpy(dtype=str),
+            "year": cpi["year"].to_numpy(dtype=int),
+            "period": cpi["period"].str.strip().to_numpy(dtype=str),
+            "value": pd.to_numeric(cpi["value"], errors="coerce").to_numpy(float),
+        }
+
+    @staticmethod
+    def _write(path: str, columns: dict) -> None:
+        temporary = path + ".tmp.npz"
+        np.savez_compressed(temporary, **columns)
+        os.replace(temporary, path)
+
+    def save(self, path: str) -> None:
+        """
+        A method to save the CPI data to a snapshot that can be loaded offline
+        """
+        self._write(path, self.columns)
+
+    def value(self, year, series_id: str = "CUUS0000SA0", period: str = "S01"):
+        """
+        A method to look up the CPI for a year, or for an array of years
+        """
+        if np.ndim(year) == 0:
+            return self.index[(series_id, int(year), period)]
+        return np.array(
+            [self.index[(series_id, int(y), period)] for y in np.ravel(year)]
+        ).reshape(np.shape(year))
 
-    def inflation(self, from_year: int, to_year: int) -> float:
+    def inflation(self, from_year, to_year) -> float:
         """
         A method to retrieve United States CPI data and calculate inflation
         """
-        cpi_from = self.cpi[
-            (self.cpi["series_id"] == "CUUS0000SA0      ")
-            & (self.cpi["year"] == from_year)
-            & (self.cpi["period"] == "S01")
-        ]["value"]
-        cpi_to = self.cpi[
-            (self.cpi["series_id"] == "CUUS0000SA0      ")
-            & (self.cpi["year"] == to_year)
-            & (self.cpi["period"] == "S01")
-        ]["value"]
-        return cpi_to.values[0] / cpi_from.values[0]
+        return self.value(to_year) / self.value(from_year)
@@ -0,0 +1,20 @@
+"""
+Functions to scope the matplotlib style used by RAIL
+"""
+
+import contextlib
+
+STYLES = ["seaborn-poster", "seaborn-v0_8-poster"]
+
+
+def style():
+    """
+    A context manager to plot in the RAIL style without changing the global
+    matplotlib style
+    """
+    from matplotlib import pyplot as plt
+
+    for name in STYLES:
+        if name in plt.style.available:
+            return plt.style.context(name)
+    return contextlib.nullcontext()
@@ -4,9 +4,9 @@ A class to represent an Impact
 
 from collections import UserDict
 
-from matplotlib import pyplot as plt
 import numpy as np
-from scipy.stats import lognorm
+
+from .display import style
 
 
 class Impact(UserDict):
@@ -50,16 +50,20 @@ class Impact(UserDict):
         """
         A method to plot the impact
         """
+        from matplotlib import pyplot as plt
+        from scipy.stats import lognorm
+
         x = np.linspace(
             lognorm.ppf(0.001, s=self.data["sigma"], scale=np.exp(self.data["mu"])),
             lognorm.ppf(0.999, s=self.data["sigma"], scale=np.exp(self.data["mu"])),
             num,
         )
-        plt.title("%s (PDF)" % (self.data["name"]))
-        plt.ylabel("relative likelihood")
-        plt.xlabel("impact")
-        return plt.plot(
-            x,
-            lognorm.pdf(x, s=self.data["sigma"], scale=np.exp(self.data["mu"])),
-            axes=axes,
-        )
+        with style():
+            plt.title("%s (PDF)" % (self.data["name"]))
+            plt.ylabel("relative likelihood")
+            plt.xlabel("impact")
+            return plt.plot(
+                x,
+                lognorm.pdf(x, s=self.data["sigma"], scale=np.exp(self.data["mu"])),
+                axes=axes,
+            )
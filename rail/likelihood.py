@@ -4,8 +4,8 @@ A class to represent a Likelihood
 
 from collections import UserDict
 
-from matplotlib import pyplot as plt
-import numpy as np
+from .display import style
+from .sampling import get_rng
 
 
 class Likelihood(UserDict):
@@ -22,12 +22,15 @@ class Likelihood(UserDict):
         self.data["name"] = str(lam)
         self.data["lam"] = lam
 
-    def plot(self, axes=None) -> tuple:
+    def plot(self, axes=None, rng=None) -> tuple:
         """
         A method to plot the likelihood
         """
-        s = np.random.poisson(self.data["lam"], 10000)
-        plt.title("%s (histogram)" % (self.data["name"]))
-        plt.ylabel("relative frequency")
-        plt.xlabel("likelihood")
-        return plt.hist(s, 14, axes=axes)
+        from matplotlib import pyplot as plt
+
+        s = get_rng(rng).poisson(self.data["lam"], 10000)
+        with style():
+            plt.title("%s (histogram)" % (self.data["name"]))
+            plt.ylabel("relative frequency")
+            plt.xlabel("likelihood")
+            return plt.hist(s, 14, axes=axes)
@@ -0,0 +1,121 @@
+"""
+Functions to load a register of risks from tables
+"""
+
+import os
+
+import numpy as np
+
+from .register import RiskRegister
+
+
+def read_table(table):
+    """
+    A function to read a table into a DataFrame from a CSV or Parquet file,
+    an Arrow table or a DataFrame
+    """
+    import pandas as pd
+
+    if isinstance(table, (str, os.PathLike)):
+        if str(table).lower().endswith((".parquet", ".pq")):
+            return pd.read_parquet(table)
+        return pd.read_csv(table)
+    if hasattr(table, "to_pandas"):
+        return table.to_pandas()
+    return pd.DataFrame(table)
+
+
+def load_register(
+    risks, controls=None, threat_events=None, separator: str = ";"
+) -> RiskRegister:
+    """
+    A function to build a RiskRegister from tables in one pass.
+
+    Each row of risks has a threat_event name, a system path such as
+    /root/server/disk, a likelihood lam, an impact mu and sigma, and
+    optionally an impact name and the names of its controls joined by
+    separator. Threat sources come from a threat_source column in risks or
+    from a threat_events table with name and threat_source columns. Controls
+    are defined by a controls table with name, cost, reduction and optionally
+    implemented columns. Every name a risk refers to must be defined.
+    """
+    import pandas as pd
+
+    risks = read_table(risks).reset_index(drop=True)
+    if threat_events is None:
+        if "threat_source" not in risks:
+            raise KeyError("risks need a threat_source column without threat_events")
+        threat_events = risks[["threat_event", "threat_source"]].drop_duplicates(
+            "threat_event"
+        )
+    else:
+        threat_events = read_table(threat_events).rename(
+            columns={"name": "threat_event"}
+        )
+    threat_event_name = pd.Index(threat_events["threat_event"].astype(str))
+    threat_event = _codes(threat_event_name, risks["threat_event"], "threat event")
+    threat_event_source, threat_source_name = pd.factorize(
+        threat_events["threat_source"].astype(str)
+    )
+
+    controls = read_table(controls) if controls is not None else pd.DataFrame()
+    control_name = pd.Index(controls.get("name", pd.Series(dtype=str)).astype(str))
+    if "controls" in risks:
+        names = risks["controls"].fillna("").astype(str).str.split(separator).explode()
+        names = names.str.strip()
+        names = names[names != ""]
+        rows = names.index.to_numpy()
+        columns = _codes(control_name, names, "control")
+    else:
+        rows = columns = np.zeros(0, dtype=np.int64)
+
+    system, system_path = pd.factorize(risks["system"].astype(str))
+    impact_names = (
+        risks["impact"] if "impact" in risks else pd.Series(["impact"] * len(risks))
+    )
+    impact, impact_name = pd.factorize(impact_names.astype(str))
+    return RiskRegister(
+        lam=risks["lam"].to_numpy(dtype=float),
+        mu=risks["mu"].to_numpy(dtype=float),
+        sigma=risks["sigma"].to_numpy(dtype=float),
+        threat_event=threat_event,
+        system=system,
+        impact=impact,
+        incidence=(np.ones(len(rows)), (rows, columns)),
+        control_name=control_name.to_numpy(),
+        control_cost=controls.get("cost", pd.Series(dtype=float)).to_numpy(float),
+        control_reduction=controls.get("reduction", pd.Series(dtype=float)).to_numpy(
+            float
+        ),
+        control_implemented=(
+            controls["implemented"].to_numpy(dtype=bool)
+            if "implemented" in controls
+            else np.ones(len(controls), dtype=bool)
+        ),
+        threat_event_name=threat_event_name.to_numpy(),
+        threat_event_source=threat_event_source,
+        threat_source_name=np.asarray(threat_source_name),
+        system_path=np.asarray(system_path),
+        impact_name=np.asarray(impact_name),
+    )
+
+
+def load(risks, controls=None, threat_events=None, separator: str = ";") -> dict:
+    """
+    A function to load the ThreatSources, ThreatEvents, systems, Controls,
+    Vulnerabilities and Risks of a register from tables, as described in
+    load_register
+    """
+    return load_register(risks, controls, threat_events, separator).to_model()
+
+
+def _codes(index, values, kind: str) -> np.ndarray:
+    """
+    Look up the position of every value in index, raising a KeyError that
+    names the missing values
+    """
+    codes = index.get_indexer(values.astype(str))
+    if (codes < 0).any():
+        missing = sorted(set(values.astype(str)[codes < 0]))
+        raise KeyError("Unknown %s: %s" % (kind, ", ".join(missing[:10])))
+    return codes
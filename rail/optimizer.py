@@ -0,0 +1,623 @@
+"""
+A class to find the optimum set of Controls for a set of Risks
+"""
+
+import copy
+
+import numpy as np
+
+from .profiling import count, phase
+
+METHODS = ["branch_and_bound", "greedy"]
+MAX_FRONTIER_CONTROLS = 16
+MAX_BUDGET_NODES = 10**4
+
+
+class Optimizer:
+    """
+    A class to find the optimum set of Controls for a set of Risks
+
+    The dependence of every risk on every control is precomputed, so a
+    portfolio of controls is evaluated from arrays instead of re-walking the
+    Risk and Control objects. Controls that share no risks are independent and
+    are optimized separately.
+    """
+
+    def __init__(self, risks, controls, controls_to_optimize=None) -> None:
+        if controls_to_optimize is None:
+            controls_to_optimize = controls
+        self.controls = controls
+        self.names = list(controls_to_optimize)
+        optimized = set(self.names)
+        index = {id(controls[name]): i for i, name in enumerate(self.names)}
+        self.cost = np.array(
+            [controls[name]["cost"] for name in self.names], dtype=float
+        )
+        self.reduction = np.array(
+            [controls[name]["reduction"] for name in self.names], dtype=float
+        )
+        self.fixed_cost = sum(
+            control["cost"]
+            for name, control in controls.items()
+            if name not in optimized and control["implemented"] is True
+        )
+        weights = []
+        rows = [[] for _ in self.names]
+        for row, risk in enumerate(risks.values()):
+            weight = risk["likelihood"]["lam"] * risk["impact"]["mean"]
+            for control in risk["vulnerability"]["controls"]:
+                column = index.get(id(control))
+                if column is not None:
+                    rows[column].append(row)
+                elif control["implemented"] is True:
+                    weight *= control["reduction"]
+            weights.append(weight)
+        self.weight = np.array(weights, dtype=float)
+        self.rows = [np.array(row, dtype=int) for row in rows]
+        self.nodes = 0
+
+    def components(self) -> list:
+        """
+        A method to group the controls into sets that share no risks
+        """
+        parent = list(range(len(self.names)))
+
+        def find(column):
+            while parent[column] != column:
+                parent[column] = parent[parent[column]]
+                column = parent[column]
+            return column
+
+        first = {}
+        for column, rows in enumerate(self.rows):
+            for row in rows:
+                other = first.setdefault(row, column)
+                parent[find(column)] = find(other)
+        groups = {}
+        for column in range(len(self.names)):
+            groups.setdefault(find(column), []).append(column)
+        return list(groups.values())
+
+    def evaluate(self, implemented) -> tuple:
+        """
+        A method to compute the deterministic loss and cost of a portfolio
+        """
+        implemented = np.asarray(implemented, dtype=bool)
+        product = np.ones(len(self.weight))
+        for column in np.flatnonzero(implemented):
+            np.multiply.at(product, self.rows[column], self.reduction[column])
+        loss = float(self.weight @ product)
+        cost = float(self.fixed_cost + self.cost[implemented].sum())
+        return loss, cost
+
+    def portfolio(self, implemented):
+        """
+        A method to create a copy of the Controls with a portfolio implemented
+        """
+        controls = copy.deepcopy(self.controls)
+        for name, flag in zip(self.names, implemented):
+            controls[name]["implemented"] = bool(flag)
+        return controls
+
+    def solve(self, method: str = "branch_and_bound") -> dict:
+        """
+        A method to find the portfolio of controls with the lowest loss plus
+        cost. The method is either "branch_and_bound", which is exact, or
+        "greedy".
+        """
+        implemented = self.minimize(method)
+        loss, cost = self.evaluate(implemented)
+        with phase("deepcopy"):
+            controls = self.portfolio(implemented)
+        return {"loss": loss, "cost": cost, "controls": controls}
+
+    def minimize(self, method: str = "branch_and_bound") -> np.ndarray:
+        """
+        A method to find the implemented flags of the portfolio with the
+        lowest loss plus cost, as solve does, without copying the Controls
+        """
+        self.nodes = 0
+        with phase("optimizer"):
+            implemented = self._minimize(1.0, method)
+        count("optimizer_nodes", self.nodes)
+        return implemented
+
+    def solve_budget(self, budget: float, method: str = "branch_and_bound") -> dict:
+        """
+        A method to find the portfolio of controls with the lowest loss whose
+        total cost is at most budget. A Lagrangian relaxation first prices
+        cost in units of loss: each step greedily minimizes loss plus price
+        times cost at the price where the cheapest portfolio over budget and
+        the best one within it found so far tie, until no portfolio beats
+        that tie. The best portfolio within budget is topped up with any
+        controls that still fit. With "branch_and_bound" it is then improved
+        to the optimum, by merging the frontiers of the components when none
+        has more than MAX_FRONTIER_CONTROLS controls and otherwise by a search
+        bounded at that price, which stops with the best portfolio found
+        after MAX_BUDGET_NODES nodes. Besides the loss, cost and controls,
+        returns the marginal_value, the loss saved per unit of extra budget
+        at that price, and exact, whether the portfolio is proven optimal.
+        """
+        if method not in METHODS:
+            raise ValueError("Optimizer method must be one of %s." % METHODS)
+        self.nodes = 0
+        with phase("optimizer"):
+            within = self.cost < 0
+            over = self.reduction < 1
+            over &= np.array([len(rows) > 0 for rows in self.rows], dtype=bool)
+            within_loss, within_cost = self.evaluate(within)
+            over_loss, over_cost = self.evaluate(over)
+            if within_cost > budget:
+                raise ValueError(
+                    "Budget must be at least the lowest cost of any portfolio, %s."
+                    % within_cost
+                )
+            price = 0.0
+            implemented = over
+            exact = True
+            if over_cost > budget:
+                while True:
+                    price = (within_loss - over_loss) / (over_cost - within_cost)
+                    implemented = self._minimize(price, "greedy")
+                    loss, cost = self.evaluate(implemented)
+                    tie = over_loss + price * over_cost
+                    if loss + price * cost >= tie - 1e-9 * abs(tie):
+                        break
+                    if cost > budget:
+                        over, over_loss, over_cost = implemented, loss, cost
+                    else:
+                        within, within_loss, within_cost = implemented, loss, cost
+                implemented = self._fill(within, budget)
+                components = self.components()
+                if method != "branch_and_bound":
+                    exact = False
+                elif max(map(len, components)) <= MAX_FRONTIER_CONTROLS:
+                    implemented = self._merge(components, budget)[2][-1]
+                else:
+                    implemented, exact = self._budget_search(budget, price, implemented)
+            loss, cost = self.evaluate(implemented)
+        count("optimizer_nodes", self.nodes)
+        with phase("deepcopy"):
+            controls = self.portfolio(implemented)
+        return {
+            "loss": loss,
+            "cost": cost,
+            "controls": controls,
+            "marginal_value": price,
+            "exact": exact,
+        }
+
+    def _minimize(self, price: float, method: str) -> np.ndarray:
+        """
+        The implemented flags of the portfolio with the lowest loss plus price
+        times cost
+        """
+        if method not in METHODS:
+            raise ValueError("Optimizer method must be one of %s." % METHODS)
+        solver = getattr(self, "_" + method)
+        implemented = np.zeros(len(self.names), dtype=bool)
+        for columns in self.components():
+            weight, rows, reduction, cost = self._component(columns)
+            implemented[columns] = solver(weight, rows, reduction, price * cost)
+        return implemented
+
+    def _fill(self, implemented, budget: float) -> np.ndarray:
+        """
+        Add the control that saves the most loss per unit of cost and still
+        fits in the budget until none does
+        """
+        implemented = implemented.copy()
+        product = np.ones(len(self.weight))
+        for column in np.flatnonzero(implemented):
+            np.multiply.at(product, self.rows[column], self.reduction[column])
+        spare = budget - self.evaluate(implemented)[1]
+        while True:
+            best, best_ratio = None, 0
+            for column in np.flatnonzero(~implemented & (self.cost <= spare)):
+                saving = -self._delta(
+                    self.weight, product, self.rows[column], self.reduction[column]
+                )
+                ratio = saving / self.cost[column] if self.cost[column] > 0 else np.inf
+                if saving > 0 and ratio > best_ratio:
+                    best, best_ratio = column, ratio
+            if best is None:
+                return implemented
+            implemented[best] = True
+            spare -= self.cost[best]
+            np.multiply.at(product, self.rows[best], self.reduction[best])
+
+    def frontier(self):
+        """
+        A method to find the Pareto frontier of cost against loss, the
+        portfolios that no other portfolio matches on both. Returns a
+        DataFrame sorted by cost with the cost, the loss and a tuple of the
+        names of the implemented controls of every portfolio on it.
+        """
+        import pandas as pd
+
+        self.nodes = 0
+        with phase("frontier"):
+            cost, loss, implemented = self._merge(self.components())
+        count("optimizer_nodes", self.nodes)
+        return pd.DataFrame(
+            {
+                "cost": cost,
+                "loss": loss,
+                "controls": [
+                    tuple(name for name, flag in zip(self.names, flags) if flag)
+                    for flags in implemented
+                ],
+            }
+        )
+
+    def _merge(self, components, budget: float = np.inf) -> tuple:
+        """
+        Combine the Pareto frontiers of independent components one at a time,
+        keeping after each only the portfolios that no other matches on both
+        cost and loss and that can still cost at most budget once the cheapest
+        portfolios of the components left, which may cost less than nothing,
+        are added. Returns their costs, losses and implemented flags sorted by
+        cost.
+        """
+        touched = np.zeros(len(self.weight), dtype=bool)
+        for rows in self.rows:
+            touched[rows] = True
+        cost = np.array([float(self.fixed_cost)])
+        loss = np.array([self.weight[~touched].sum()])
+        implemented = np.zeros((1, len(self.names)), dtype=bool)
+        frontiers = [
+            self._frontier(*self._component(columns)) for columns in components
+        ]
+        refunds = np.cumsum([frontier[0].min() for frontier in frontiers][::-1])[::-1]
+        refunds = np.append(refunds[1:], 0)
+        for columns, (costs, losses, flags), refund in zip(
+            components, frontiers, refunds
+        ):
+            left, right = np.divmod(np.arange(len(cost) * len(costs)), len(costs))
+            keep = _pareto(cost[left] + costs[right], loss[left] + losses[right])
+            keep = keep[cost[left[keep]] + costs[right[keep]] + refund <= budget]
+            left, right = left[keep], right[keep]
+            cost = cost[left] + costs[right]
+            loss = loss[left] + losses[right]
+            implemented = implemented[left]
+            implemented[:, columns] = flags[right]
+        return cost, loss, implemented
+
+    def _frontier(self, weight, rows, reduction, cost) -> tuple:
+        """
+        Search the on/off tree depth first for the Pareto frontier of one
+        component, skipping any branch whose lowest possible cost and lowest
+        possible loss are both matched by a portfolio already found. Controls
+        that could save the most are decided first, and implemented before
+        not, so that good portfolios are found early. Returns the cost, loss
+        and implemented flags of the portfolios on it.
+        """
+        count = len(rows)
+        floor = np.log(np.maximum(np.minimum(reduction, 1), np.finfo(float).tiny))
+        remaining = np.zeros(len(weight))
+        for column in range(count):
+            np.add.at(remaining, rows[column], floor[column])
+        refund = np.minimum(cost, 0).sum()
+        product = np.ones(len(weight))
+        implemented = np.zeros(count, dtype=bool)
+        found = {"cost": np.zeros(0), "loss": np.zeros(0), "implemented": []}
+        saving = [
+            weight[rows[column]].sum() * (1 - min(reduction[column], 1))
+            for column in range(count)
+        ]
+        order = np.argsort(-np.array(saving), kind="stable")
+
+        def search(depth: int, spent: float, refund: float) -> None:
+            self.nodes += 1
+            lowest = float((weight * product) @ np.exp(remaining))
+            if ((found["cost"] <= spent + refund) & (found["loss"] <= lowest)).any():
+                return
+            if depth == count:
+                keep = (found["cost"] < spent) | (found["loss"] < lowest)
+                found["cost"] = np.append(found["cost"][keep], spent)
+                found["loss"] = np.append(found["loss"][keep], lowest)
+                found["implemented"] = [
+                    flags for flags, kept in zip(found["implemented"], keep) if kept
+                ] + [implemented.copy()]
+                return
+            column = order[depth]
+            np.add.at(remaining, rows[column], -floor[column])
+            refund -= min(cost[column], 0)
+            saved = product[rows[column]]
+            implemented[column] = True
+            np.multiply.at(product, rows[column], reduction[column])
+            search(depth + 1, spent + cost[column], refund)
+            product[rows[column]] = saved
+            implemented[column] = False
+            search(depth + 1, spent, refund)
+            np.add.at(remaining, rows[column], floor[column])
+
+        search(0, 0.0, refund)
+        return (
+            found["cost"],
+            found["loss"],
+            np.array(found["implemented"], dtype=bool).reshape(-1, count),
+        )
+
+    def _budget_search(self, budget: float, price: float, implemented):
+        """
+        Search the on/off tree depth first for the portfolio with the lowest
+        loss within budget, starting from implemented. A branch is pruned
+        when the bound of branch_and_bound on loss plus price times cost,
+        less price times the budget left, cannot beat the best loss found,
+        since no portfolio within budget can do better than that. Returns the
+        best implemented flags and whether the search finished within
+        MAX_BUDGET_NODES nodes, so that they are proven optimal.
+        """
+        weight, rows, reduction, cost = (
+            self.weight,
+            self.rows,
+            self.reduction,
+            self.cost,
+        )
+        count = len(rows)
+        undecided = np.ones(count + 1, dtype=bool)
+        undecided[count] = False
+        bound = _Bound(weight, rows, np.minimum(reduction, 1), price * cost)
+        bound.tune(weight, undecided)
+        saving = [
+            weight[rows[column]].sum() * (1 - min(reduction[column], 1))
+            for column in range(count)
+        ]
+        ratio = np.divide(saving, cost, out=np.full(count, np.inf), where=cost > 0)
+        order = np.argsort(-ratio, kind="stable")
+        best = {"implemented": implemented, "loss": self.evaluate(implemented)[0]}
+        product = np.ones(len(weight))
+        flags = np.zeros(count, dtype=bool)
+
+        limit = self.nodes + MAX_BUDGET_NODES
+
+        def search(depth: int, left: float, refund: float) -> None:
+            self.nodes += 1
+            if refund > left or self.nodes > limit:
+                return
+            lowest = bound(weight * product, undecided) - price * left
+            if lowest >= best["loss"] * (1 - 1e-12):
+                return
+            if depth == count:
+                if weight @ product < best["loss"]:
+                    best["loss"] = float(weight @ product)
+                    best["implemented"] = flags.copy()
+                return
+            column = order[depth]
+            undecided[column] = False
+            refund -= min(cost[column], 0)
+            saved = product[rows[column]]
+            flags[column] = True
+            np.multiply.at(product, rows[column], reduction[column])
+            search(depth + 1, left - cost[column], refund)
+            product[rows[column]] = saved
+            flags[column] = False
+            search(depth + 1, left, refund)
+            undecided[column] = True
+
+        search(0, budget - self.fixed_cost, np.minimum(cost, 0).sum())
+        return best["implemented"], self.nodes <= limit
+
+    def _component(self, columns) -> tuple:
+        risks = np.unique(np.concatenate([self.rows[column] for column in columns]))
+        return (
+            self.weight[risks],
+            [np.searchsorted(risks, self.rows[column]) for column in columns],
+            self.reduction[columns],
+            self.cost[columns],
+        )
+
+    def _greedy(self, weight, rows, reduction, cost) -> np.ndarray:
+        """
+        Add the control that lowers loss plus cost the most until none does
+        """
+        product = np.ones(len(weight))
+        implemented = np.zeros(len(rows), dtype=bool)
+        while True:
+            self.nodes += 1
+            best, best_delta = None, 0
+            for column in np.flatnonzero(~implemented):
+                delta = cost[column] + self._delta(
+                    weight, product, rows[column], reduction[column]
+                )
+                if delta < best_delta:
+                    best, best_delta = column, delta
+            if best is None:
+                return implemented
+            implemented[best] = True
+            np.multiply.at(product, rows[best], reduction[best])
+
+    @staticmethod
+    def _delta(weight, product, rows, reduction) -> float:
+        """
+        The change in loss when a control is added to the current portfolio
+        """
+        unique, counts = np.unique(rows, return_counts=True)
+        return float(weight[unique] @ (product[unique] * (reduction**counts - 1)))
+
+    def _branch_and_bound(self, weight, rows, reduction, cost) -> np.ndarray:
+        """
+        Search the on/off tree depth first, pruning any branch whose lower
+        bound cannot beat the best portfolio found so far. The bound splits
+        the cost of each control across the risks it reduces and lets every
+        risk pick its own best subset of the undecided controls.
+        """
+        count = len(rows)
+        undecided = np.ones(count + 1, dtype=bool)
+        undecided[count] = False
+        bound = _Bound(weight, rows, np.minimum(reduction, 1), cost)
+        bound.tune(weight, undecided)
+        gain = np.array(
+            [
+                -cost[c]
+                - self._delta(weight, np.ones(len(weight)), rows[c], reduction[c])
+                for c in range(count)
+            ]
+        )
+        order = np.argsort(-gain, kind="stable")
+
+        best = {"implemented": self._greedy(weight, rows, reduction, cost)}
+        product = np.ones(len(weight))
+        for column in np.flatnonzero(best["implemented"]):
+            np.multiply.at(product, rows[column], reduction[column])
+        best["value"] = float(weight @ product + cost[best["implemented"]].sum())
+        product = np.ones(len(weight))
+        implemented = np.zeros(count, dtype=bool)
+
+        def search(depth: int, spent: float) -> None:
+            self.nodes += 1
+            if spent + bound(weight * product, undecided) >= best["value"]:
+                return
+            if depth == count:
+                best["value"] = float(spent + weight @ product)
+                best["implemented"] = implemented.copy()
+                return
+            column = order[depth]
+            undecided[column] = False
+            saved = product[rows[column]]
+            delta = self._delta(weight, product, rows[column], reduction[column])
+            on_first = delta + cost[column] < 0
+            for flag in (on_first, not on_first):
+                implemented[column] = flag
+                if flag:
+                    np.multiply.at(product, rows[column], reduction[column])
+                    search(depth + 1, spent + cost[column])
+                    product[rows[column]] = saved
+                else:
+                    search(depth + 1, spent)
+            implemented[column] = False
+            undecided[column] = True
+
+        search(0, 0.0)
+        return best["implemented"]
+
+
+class _Bound:
+    """
+    A Lagrangian decomposition lower bound on the loss plus cost of the
+    undecided controls. Risks with few controls enumerate every subset of
+    them, risks with many controls use the diminishing returns of adding
+    controls instead.
+    """
+
+    MAX_SUBSET_SIZE = 6
+
+    def __init__(self, weight, rows, floor, cost) -> None:
+        count = len(rows)
+        per_risk = [{} for _ in weight]
+        for column, row in enumerate(rows):
+            for risk in row:
+                per_risk[risk][column] = per_risk[risk].get(column, 0) + 1
+        savings = [
+            {
+                column: weight[risk] * (1 - floor[column] ** k)
+                for column, k in slots.items()
+            }
+            for risk, slots in enumerate(per_risk)
+        ]
+        total = np.zeros(count)
+        for risk_savings in savings:
+            for column, saving in risk_savings.items():
+                total[column] += saving
+        self.rowless = np.array([len(row) == 0 for row in rows] + [False])
+        self.cost = np.append(cost, 0)
+        self.groups = []
+        sizes = np.array([len(slots) for slots in per_risk])
+        for small in (True, False):
+            risks = np.flatnonzero(
+                (sizes <= self.MAX_SUBSET_SIZE)
+                if small
+                else (sizes > self.MAX_SUBSET_SIZE)
+            )
+            if len(risks) == 0:
+                continue
+            width = max(sizes[risks].max(), 1)
+            slots = np.full((len(risks), width), count)
+            log_factor = np.zeros((len(risks), width))
+            share = np.zeros((len(risks), width))
+            for i, risk in enumerate(risks):
+                for j, (column, k) in enumerate(per_risk[risk].items()):
+                    slots[i, j] = column
+                    log_factor[i, j] = k * np.log(
+                        max(floor[column], np.finfo(float).tiny)
+                    )
+                    if total[column] > 0:
+                        share[i, j] = (
+                            cost[column] * savings[risk][column] / total[column]
+                        )
+                    else:
+                        share[i, j] = cost[column] / len(np.unique(rows[column]))
+            subsets = None
+            if small:
+                subsets = (
+                    (np.arange(2**width)[:, np.newaxis] >> np.arange(width)) & 1
+                ).astype(float)
+            self.groups.append((risks, slots, log_factor, share, subsets))
+
+    def __call__(self, loss, undecided) -> float:
+        return self.evaluate(loss, undecided)[0]
+
+    def evaluate(self, loss, undecided) -> tuple:
+        """
+        The bound and, for every group, which controls each risk picked
+        """
+        bound = np.minimum(self.cost[undecided & self.rowless], 0).sum()
+        picks = []
+        for risks, slots, log_factor, share, subsets in self.groups:
+            active = undecided[slots]
+            log_factor = np.where(active, log_factor, 0)
+            share = np.where(active, share, 0)
+            if subsets is not None:
+                values = (
+                    loss[risks, np.newaxis] * np.exp(log_factor @ subsets.T)
+                    + share @ subsets.T
+                )
+                best = values.argmin(axis=1)
+                bound += values[np.arange(len(risks)), best].sum()
+                picks.append(subsets[best] * active)
+            else:
+                saving = loss[risks, np.newaxis] * (1 - np.exp(log_factor)) - share
+                bound += (loss[risks] - np.maximum(saving, 0).sum(axis=1)).sum()
+                picks.append((saving > 0) * active)
+        return bound, picks
+
+    def tune(self, loss, undecided, iterations: int = 100) -> None:
+        """
+        Shift the cost of each control towards the risks that want it and away
+        from those that do not, keeping the split that gives the best bound
+        """
+        count = len(self.cost)
+        best_bound, picks = self.evaluate(loss, undecided)
+        best_shares = [group[3].copy() for group in self.groups]
+        scale = np.abs(self.cost).mean() if count > 1 else 0
+        for iteration in range(iterations):
+            wanted = np.zeros(count)
+            users = np.zeros(count)
+            for (risks, slots, *_), pick in zip(self.groups, picks):
+                np.add.at(wanted, slots, pick)
+                np.add.at(users, slots, 1)
+            average = wanted / np.maximum(users, 1)
+            step = scale / (iteration + 1)
+            for (risks, slots, log_factor, share, subsets), pick in zip(
+                self.groups, picks
+            ):
+                share += step * (pick - average[slots]) * (slots < count - 1)
+            bound, picks = self.evaluate(loss, undecided)
+            if bound > best_bound:
+                best_bound = bound
+                best_shares = [group[3].copy() for group in self.groups]
+        for group, share in zip(self.groups, best_shares):
+            group[3][...] = share
+
+
+def _pareto(cost, loss) -> np.ndarray:
+    """
+    The indices, sorted by cost, of the points that no other point matches on
+    both cost and loss
+    """
+    order = np.lexsort((loss, cost))
+    lowest = np.minimum.accumulate(loss[order])
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] = loss[order][1:] < lowest[:-1]
+    return order[keep]
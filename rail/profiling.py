@@ -0,0 +1,174 @@
+"""
+A class to profile where time and memory go in Risks evaluation
+"""
+
+import json
+import time
+import tracemalloc
+
+_ACTIVE = None
+
+
+class Profiler:
+    """
+    A class to profile where time and memory go in Risks evaluation
+
+    Used as a context manager, it records the wall time, calls and iterations
+    of every phase that runs inside it, such as sampling, reductions, the
+    optimizer and deepcopy, and counters such as the optimizer nodes visited.
+    With memory set it also records the high-water mark of each phase: the
+    most memory tracemalloc saw allocated during it beyond what was allocated
+    when it began. A phase that runs inside itself is only timed at its
+    outermost call. The callback, if given, is called with the name and the
+    seconds, iterations and peak bytes of every phase as it ends. When no
+    Profiler is active, phases and counters do nothing.
+    """
+
+    def __init__(self, memory: bool = False, callback=None) -> None:
+        self.memory = memory
+        self.callback = callback
+        self.seconds = 0.0
+        self.peak_bytes = None
+        self.phases = {}
+        self.counters = {}
+        self._open = {}
+        self._peaks = []
+        self._previous = None
+        self._tracing = False
+
+    def __enter__(self) -> "Profiler":
+        global _ACTIVE
+        self._previous, _ACTIVE = _ACTIVE, self
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._tracing = True
+            tracemalloc.reset_peak()
+            self._peaks.append(0)
+            self._base = tracemalloc.get_traced_memory()[0]
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exception) -> bool:
+        global _ACTIVE
+        self.seconds += time.perf_counter() - self._start
+        if self.memory:
+            peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+            self.peak_bytes = max(self.peak_bytes or 0, peak - self._base)
+            if self._tracing:
+                tracemalloc.stop()
+                self._tracing = False
+        _ACTIVE = self._previous
+        return False
+
+    def count(self, name: str, number: int = 1) -> None:
+        """
+        A method to add number to a counter
+        """
+        self.counters[name] = self.counters.get(name, 0) + number
+
+    def to_dict(self) -> dict:
+        """
+        A method to return the profile as a dict
+        """
+        return {
+            "seconds": self.seconds,
+            "peak_bytes": self.peak_bytes,
+            "phases": {name: dict(phase) for name, phase in self.phases.items()},
+            "counters": dict(self.counters),
+        }
+
+    def to_json(self, path: str = None) -> str:
+        """
+        A method to return the profile as JSON, also writing it to path if
+        given
+        """
+        text = json.dumps(self.to_dict(), indent=1)
+        if path is not None:
+            with open(path, "w") as output:
+                output.write(text)
+        return text
+
+
+class _Phase:
+    """
+    A context manager that records one call of a phase in a Profiler
+    """
+
+    def __init__(self, profiler: Profiler, name: str, iterations: int) -> None:
+        self.profiler = profiler
+        self.name = name
+        self.iterations = iterations
+
+    def __enter__(self) -> "_Phase":
+        profiler = self.profiler
+        self.outermost = profiler._open.get(self.name, 0) == 0
+        profiler._open[self.name] = profiler._open.get(self.name, 0) + 1
+        if self.outermost:
+            if profiler.memory:
+                current, peak = tracemalloc.get_traced_memory()
+                profiler._peaks[-1] = max(profiler._peaks[-1], peak)
+                tracemalloc.reset_peak()
+                profiler._peaks.append(0)
+                self.base = current
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exception) -> bool:
+        profiler = self.profiler
+        profiler._open[self.name] -= 1
+        if not self.outermost:
+            return False
+        seconds = time.perf_counter() - self.start
+        peak = None
+        if profiler.memory:
+            peak = max(profiler._peaks.pop(), tracemalloc.get_traced_memory()[1])
+            profiler._peaks[-1] = max(profiler._peaks[-1], peak)
+            peak -= self.base
+        phase = profiler.phases.setdefault(
+            self.name, {"calls": 0, "seconds": 0.0, "iterations": 0}
+        )
+        phase["calls"] += 1
+        phase["seconds"] += seconds
+        phase["iterations"] += self.iterations
+        if peak is not None:
+            phase["peak_bytes"] = max(phase.get("peak_bytes", 0), peak)
+        if profiler.callback is not None:
+            profiler.callback(
+                self.name,
+                {"seconds": seconds, "iterations": self.iterations, "peak_bytes": peak},
+            )
+        return False
+
+
+class _NullPhase:
+    """
+    A context manager that does nothing, used when no Profiler is active
+    """
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exception) -> bool:
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+def phase(name: str, iterations: int = 0):
+    """
+    A function to return a context manager that records a phase in the
+    active Profiler, or does nothing if there is none
+    """
+    if _ACTIVE is None:
+        return _NULL_PHASE
+    return _Phase(_ACTIVE, name, iterations)
+
+
+def count(name: str, number: int = 1) -> None:
+    """
+    A function to add number to a counter of the active Profiler, if any
+    """
+    if _ACTIVE is not None:
+        _ACTIVE.count(name, number)
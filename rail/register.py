@@ -0,0 +1,473 @@
+"""
+A class to represent a register of Risks as arrays
+"""
+
+import json
+import os
+
+import numpy as np
+
+from .aggregate import AggregateDistribution
+from .control import Control, Controls
+from .impact import Impact
+from .likelihood import Likelihood
+from .risk import Risks
+from .sampling import total_loss
+from .sketch import estimate_loss, loss_histogram
+from .threat_event import ThreatEvents
+from .threat_source import ThreatSources
+from .tree import Tree
+from .vulnerability import Vulnerabilities
+
+SNAPSHOT_VERSION = 1
+ARRAYS = [
+    "lam",
+    "mu",
+    "sigma",
+    "mean",
+    "threat_event",
+    "system",
+    "impact",
+    "control_name",
+    "control_cost",
+    "control_reduction",
+    "control_implemented",
+    "threat_event_name",
+    "threat_event_source",
+    "threat_source_name",
+    "system_path",
+    "impact_name",
+]
+INCIDENCE = ["data", "indices", "indptr"]
+
+
+class RiskRegister:
+    """
+    A class to represent a register of Risks as arrays
+
+    Each risk is a row of parallel arrays holding its likelihood and impact
+    parameters and integer indices into tables of threat events, systems and
+    impact names. A sparse risk by control matrix counts how many times each
+    control appears in each risk's vulnerability.
+    """
+
+    def __init__(
+        self,
+        lam,
+        mu,
+        sigma,
+        threat_event,
+        system,
+        impact,
+        incidence,
+        control_name,
+        control_cost,
+        control_reduction,
+        control_implemented,
+        threat_event_name,
+        threat_event_source,
+        threat_source_name,
+        system_path,
+        impact_name,
+    ) -> None:
+        from scipy.sparse import csr_matrix
+
+        self.lam = np.asarray(lam, dtype=float)
+        self.mu = np.asarray(mu, dtype=float)
+        self.sigma = np.asarray(sigma, dtype=float)
+        self.mean = np.exp(self.mu + self.sigma**2 / 2)
+        self.threat_event = np.asarray(threat_event, dtype=np.int32)
+        self.system = np.asarray(system, dtype=np.int32)
+        self.impact = np.asarray(impact, dtype=np.int32)
+        self.incidence = csr_matrix(
+            incidence, shape=(len(self.lam), len(control_name)), dtype=np.int8
+        )
+        self.control_name = np.asarray(control_name, dtype=str)
+        self.control_cost = np.asarray(control_cost, dtype=float)
+        self.control_reduction = np.asarray(control_reduction, dtype=float)
+        self.control_implemented = np.asarray(control_implemented, dtype=bool)
+        self.threat_event_name = np.asarray(threat_event_name, dtype=str)
+        self.threat_event_source = np.asarray(threat_event_source, dtype=np.int32)
+        self.threat_source_name = np.asarray(threat_source_name, dtype=str)
+        self.system_path = np.asarray(system_path, dtype=str)
+        self.impact_name = np.asarray(impact_name, dtype=str)
+
+    def __len__(self) -> int:
+        return len(self.lam)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The number of bytes used by the per risk arrays
+        """
+        return (
+            sum(
+                array.nbytes
+                for array in [
+                    self.lam,
+                    self.mu,
+                    self.sigma,
+                    self.mean,
+                    self.threat_event,
+                    self.system,
+                    self.impact,
+                ]
+            )
+            + self.incidence.data.nbytes
+            + self.incidence.indices.nbytes
+            + self.incidence.indptr.nbytes
+        )
+
+    @classmethod
+    def from_tables(
+        cls, risks, controls=None, threat_events=None, separator: str = ";"
+    ) -> "RiskRegister":
+        """
+        A method to create a RiskRegister from CSV or Parquet files, Arrow
+        tables or DataFrames, as described in rail.loader.load_register
+        """
+        from .loader import load_register
+
+        return load_register(risks, controls, threat_events, separator)
+
+    @classmethod
+    def from_risks(cls, risks: Risks, controls: Controls = None) -> "RiskRegister":
+        """
+        A method to create a RiskRegister from Risks. Controls found in the
+        risks' vulnerabilities are added after those in controls.
+        """
+        tables = {
+            "control": {},
+            "threat_event": {},
+            "threat_source": {},
+            "system": {},
+            "impact": {},
+        }
+        for control in (controls or {}).values():
+            tables["control"].setdefault(id(control), (len(tables["control"]), control))
+
+        def index(table: str, key, value) -> int:
+            return tables[table].setdefault(key, (len(tables[table]), value))[0]
+
+        columns = {
+            name: [] for name in ["lam", "mu", "sigma", "te", "system", "impact"]
+        }
+        rows, cols = [], []
+        for row, risk in enumerate(risks.values()):
+            vulnerability = risk["vulnerability"]
+            threat_event = vulnerability["threat_event"]
+            columns["lam"].append(risk["likelihood"]["lam"])
+            columns["mu"].append(risk["impact"]["mu"])
+            columns["sigma"].append(risk["impact"]["sigma"])
+            columns["te"].append(index("threat_event", id(threat_event), threat_event))
+            columns["system"].append(
+                index("system", id(vulnerability["system"]), vulnerability["system"])
+            )
+            columns["impact"].append(
+                index("impact", risk["impact"]["name"], risk["impact"]["name"])
+            )
+            for control in vulnerability["controls"]:
+                rows.append(row)
+                cols.append(index("control", id(control), control))
+
+        def values(table: str) -> list:
+            return [value for _, value in tables[table].values()]
+
+        threat_events = values("threat_event")
+        threat_event_source = [
+            index("threat_source", id(event["threat_source"]), event["threat_source"])
+            for event in threat_events
+        ]
+        control_objects = values("control")
+        return cls(
+            lam=columns["lam"],
+            mu=columns["mu"],
+            sigma=columns["sigma"],
+            threat_event=columns["te"],
+            system=columns["system"],
+            impact=columns["impact"],
+            incidence=(np.ones(len(rows)), (rows, cols)),
+            control_name=[control["name"] for control in control_objects],
+            control_cost=[control["cost"] for control in control_objects],
+            control_reduction=[control["reduction"] for control in control_objects],
+            control_implemented=[
+                control["implemented"] is True for control in control_objects
+            ],
+            threat_event_name=[event["name"] for event in threat_events],
+            threat_event_source=threat_event_source,
+            threat_source_name=[source["name"] for source in values("threat_source")],
+            system_path=[system.path() for system in values("system")],
+            impact_name=values("impact"),
+        )
+
+    def to_model(self) -> dict:
+        """
+        A method to create the ThreatSources, ThreatEvents, systems, Controls,
+        Vulnerabilities and Risks that the register represents
+        """
+        threat_sources = ThreatSources()
+        sources = [threat_sources.new(name) for name in self.threat_source_name]
+        threat_events = ThreatEvents()
+        events = [
+            threat_events.new(name, sources[source])
+            for name, source in zip(self.threat_event_name, self.threat_event_source)
+        ]
+        systems = {}
+        nodes = [_node(systems, path) for path in self.system_path]
+        controls = Controls()
+        control_objects = []
+        for name, cost, reduction, implemented in zip(
+            self.control_name,
+            self.control_cost,
+            self.control_reduction,
+            self.control_implemented,
+        ):
+            control = Control(
+                str(name), float(cost), float(reduction), bool(implemented)
+            )
+            controls.data[control["name"]] = control
+            control_objects.append(control)
+        vulnerabilities = Vulnerabilities()
+        shared = {}
+        risks = Risks()
+        incidence = self.incidence
+        for row in range(len(self)):
+            start, stop = incidence.indptr[row], incidence.indptr[row + 1]
+            columns = tuple(
+                np.repeat(incidence.indices[start:stop], incidence.data[start:stop])
+            )
+            key = (self.threat_event[row], self.system[row], columns)
+            if key not in shared:
+                shared[key] = vulnerabilities.new(
+                    events[self.threat_event[row]],
+                    nodes[self.system[row]],
+                    [control_objects[column] for column in columns],
+                )
+            risks.new(
+                shared[key],
+                Likelihood(float(self.lam[row])),
+                Impact(
+                    str(self.impact_name[self.impact[row]]),
+                    float(self.mu[row]),
+                    float(self.sigma[row]),
+                ),
+            )
+        return {
+            "threat_sources": threat_sources,
+            "threat_events": threat_events,
+            "systems": systems,
+            "controls": controls,
+            "vulnerabilities": vulnerabilities,
+            "risks": risks,
+        }
+
+    def to_risks(self) -> Risks:
+        """
+        A method to create the Risks that the register represents
+        """
+        return self.to_model()["risks"]
+
+    def save(self, path: str) -> None:
+        """
+        A method to write a snapshot of the register to a directory, one .npy
+        file per array and a manifest.json describing them. Strings are
+        stored as fixed width unicode arrays so that every file can be memory
+        mapped.
+        """
+        os.makedirs(path, exist_ok=True)
+        arrays = {name: getattr(self, name) for name in ARRAYS}
+        arrays.update(
+            {"incidence_" + name: getattr(self.incidence, name) for name in INCIDENCE}
+        )
+        for name, array in arrays.items():
+            np.save(os.path.join(path, name + ".npy"), np.ascontiguousarray(array))
+        manifest = {
+            "version": SNAPSHOT_VERSION,
+            "risks": len(self),
+            "controls": len(self.control_name),
+            "arrays": {
+                name: {"dtype": array.dtype.str, "shape": list(array.shape)}
+                for name, array in arrays.items()
+            },
+        }
+        with open(os.path.join(path, "manifest.json"), "w") as output:
+            json.dump(manifest, output, indent=1)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "RiskRegister":
+        """
+        A method to read a snapshot written by save. With mmap the arrays are
+        read-only memory maps of the files, so loading is near instant and
+        processes that load the same snapshot share its pages.
+        """
+        from scipy.sparse import csr_matrix
+
+        with open(os.path.join(path, "manifest.json")) as manifest:
+            manifest = json.load(manifest)
+        if manifest.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(
+                "Snapshot version must be %d, not %s."
+                % (SNAPSHOT_VERSION, manifest.get("version"))
+            )
+        arrays = {
+            name: np.load(
+                os.path.join(path, name + ".npy"), mmap_mode="r" if mmap else None
+            )
+            for name in manifest["arrays"]
+        }
+        for name, array in arrays.items():
+            if list(array.shape) != manifest["arrays"][name]["shape"]:
+                raise ValueError("Snapshot array %s has the wrong shape." % name)
+        register = cls.__new__(cls)
+        for name in ARRAYS:
+            setattr(register, name, arrays[name])
+        register.incidence = csr_matrix(
+            tuple(arrays["incidence_" + name] for name in INCIDENCE),
+            shape=(manifest["risks"], manifest["controls"]),
+        )
+        return register
+
+    def reduction(self, implemented=None) -> np.ndarray:
+        """
+        A method to compute the product of the reductions of the implemented
+        controls for every risk
+        """
+        if implemented is None:
+            implemented = self.control_implemented
+        log_reduction = np.where(
+            implemented,
+            np.log(np.maximum(self.control_reduction, np.finfo(float).tiny)),
+            0,
+        )
+        return np.exp(self.incidence @ log_reduction)
+
+    def evaluate_deterministic(self, implemented=None) -> np.ndarray:
+        """
+        A method to compute the deterministic mean loss of every risk
+        """
+        return self.lam * self.mean * self.reduction(implemented)
+
+    def expected_loss_deterministic_mean(self, implemented=None) -> float:
+        """
+        A method to compute the deterministic mean loss of all risks
+        """
+        return float(self.evaluate_deterministic(implemented).sum())
+
+    def calculate_stochastic_risks(
+        self,
+        iterations: int = 100000,
+        chunk_size: int = None,
+        rng=None,
+        sampling: str = "plain",
+    ) -> np.ndarray:
+        """
+        A method to sample the total loss of all risks
+        """
+        return total_loss(
+            self.lam * self.reduction(),
+            self.mu,
+            self.sigma,
+            iterations,
+            chunk_size,
+            rng,
+            sampling,
+        )
+
+    def loss_histogram(
+        self,
+        iterations: int = 100000,
+        chunk_iterations: int = 65536,
+        bins_per_decade: int = 100,
+        processes: int = None,
+        rng=None,
+        sampling: str = "plain",
+        frequency_tilt: float = 1.0,
+        severity_shift: float = 0.0,
+    ):
+        """
+        A method to sample the total loss of all risks into a LossHistogram
+        """
+        return loss_histogram(
+            self.lam * self.reduction(),
+            self.mu,
+            self.sigma,
+            iterations,
+            chunk_iterations,
+            bins_per_decade,
+            processes,
+            rng,
+            sampling,
+            frequency_tilt,
+            severity_shift,
+        )
+
+    def estimate_stochastic_risks(
+        self,
+        statistic: str = "mean",
+        q: float = 0.99,
+        rtol: float = 0.01,
+        time_budget: float = None,
+        batch_iterations: int = 65536,
+        max_iterations: int = 10**7,
+        rng=None,
+        sampling: str = "plain",
+    ) -> dict:
+        """
+        A method to sample the total loss of all risks in batches until the
+        statistic is known to within rtol or the time budget runs out,
+        returning its value, precision and the iterations used
+        """
+        return estimate_loss(
+            self.lam * self.reduction(),
+            self.mu,
+            self.sigma,
+            statistic=statistic,
+            q=q,
+            rtol=rtol,
+            time_budget=time_budget,
+            batch_iterations=batch_iterations,
+            max_iterations=max_iterations,
+            rng=rng,
+            sampling=sampling,
+        )
+
+    def aggregate_distribution(
+        self, points: int = 2**18, upper: float = None, tail: float = 1e-6
+    ) -> AggregateDistribution:
+        """
+        A method to compute the distribution of the total loss of all risks
+        without sampling
+        """
+        return AggregateDistribution(
+            self.lam * self.reduction(), self.mu, self.sigma, points, upper, tail
+        )
+
+    def expected_loss_stochastic_mean(
+        self, iterations: int = 1000, rng=None, sampling: str = "plain"
+    ) -> float:
+        """
+        A method to estimate the mean loss of all risks by sampling
+        """
+        return float(
+            self.calculate_stochastic_risks(
+                iterations, rng=rng, sampling=sampling
+            ).mean()
+        )
+
+
+def _node(systems: dict, path: str) -> Tree:
+    """
+    Find or create the Tree node with a path, creating its root in systems.
+    Nodes are looked up in the root's path index, so adding many children to
+    one node does not sort them between inserts.
+    """
+    names = str(path).strip("/").split("/")
+    if names[0] not in systems:
+        systems[names[0]] = Tree(names[0])
+    root = node = systems[names[0]]
+    for name in names[1:]:
+        try:
+            node = root.find(node.path() + "/" + name)
+        except KeyError:
+            node = node.add_child(name)
+    return node
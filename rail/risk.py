@@ -1,19 +1,37 @@
 import copy
 from collections import OrderedDict, UserString, UserDict
 
-from matplotlib import pyplot as plt
 import numpy as np
-import pandas as pd
-from scipy.stats import lognorm
 
+from .aggregate import AggregateDistribution
 from .control import Control, Controls
+from .display import style
 from .likelihood import Likelihood
 from .impact import Impact
+from .optimizer import Optimizer
+from .profiling import count, phase
+from .sampling import (
+    compound_loss,
+    get_rng,
+    importance_loss,
+    poisson_ppf,
+    spawn,
+    total_loss,
+    uniforms,
+)
+from .sketch import estimate_loss, loss_histogram
 from .vulnerability import Vulnerability, Vulnerabilities
 
-pd.set_option("display.float_format", lambda x: "%.2f" % x)
-pd.set_option("display.max_colwidth", -1)
-plt.style.use("seaborn-poster")
+COLUMNS = [
+    "Threat Source",
+    "Threat Event",
+    "System",
+    "Controls",
+    "Impact",
+    "Impact (mean)",
+    "Likelihood (mean)",
+]
+COST_LOSS = [("cost", float), ("loss", float)]
 
 
 class Risk(UserDict):
@@ -32,8 +50,8 @@ class Risk(UserDict):
         self.data["likelihood"] = likelihood
         self.data["impact"] = impact
 
-    def evaluate_deterministic(self) -> float:
-        reduction = np.product(
+    def reduction(self) -> float:
+        return np.prod(
             list(
                 map(
                     lambda x: x["reduction"] if x["implemented"] is True else 1,
@@ -41,124 +59,481 @@ class Risk(UserDict):
                 )
             )
         )
+
+    def evaluate_deterministic(self) -> float:
+        reduction = self.reduction()
         return self.data["likelihood"]["lam"] * self.data["impact"]["mean"] * reduction
 
-    def evaluate_lognormal(self, iterations: int = 1000) -> float:
-        reduction = np.product(
-            list(
-                map(
-                    lambda x: x["reduction"] if x["implemented"] is True else 1,
-                    self.data["vulnerability"]["controls"],
-                )
-            )
-        )
-        return lognorm.ppf(
-            np.random.rand(iterations),
-            s=self.data["impact"]["sigma"],
-            scale=np.exp(self.data["impact"]["mu"]),
-        ) * np.random.poisson(
-            lam=self.data["likelihood"]["lam"] * reduction, size=iterations
-        )
+    def evaluate_lognormal(
+        self, iterations: int = 1000, rng=None, sampling: str = "plain"
+    ) -> float:
+        from scipy.special import ndtri
+
+        rng = get_rng(rng)
+        lam = self.data["likelihood"]["lam"] * self.reduction()
+        if sampling == "plain":
+            z = None
+            frequency = rng.poisson(lam=lam, size=iterations)
+        else:
+            z, frequency = uniforms(2, iterations, sampling, rng)
+            z = ndtri(z)
+            frequency = poisson_ppf(frequency, lam)
+        return compound_loss(
+            frequency, self.data["impact"]["mu"], self.data["impact"]["sigma"], z, rng
+        )[0]
 
 
 class Risks(UserDict):
     def __init__(self) -> None:
         self.data = {}
-        self.dataframe = pd.DataFrame(
-            columns=[
-                "Threat Source",
-                "Threat Event",
-                "System",
-                "Controls",
-                "Impact",
-                "Impact (mean)",
-                "Likelihood (mean)",
-            ]
-        )
-        self.cost_loss = []
+        self.columns = {column: [] for column in COLUMNS}
+        self._dataframe = None
+        self._matrix = None
+        self._values = None
+        self.cost_loss = np.zeros(0, dtype=COST_LOSS)
+
+    def __setitem__(self, key: str, value: Risk) -> None:
+        self.data[key] = value
+        self._matrix = None
+
+    def __delitem__(self, key: str) -> None:
+        del self.data[key]
+        self._matrix = None
+
+    @property
+    def dataframe(self):
+        """
+        The risks as a DataFrame, built from the column buffers when accessed
+        """
+        if self._dataframe is None:
+            import pandas as pd
+
+            with phase("dataframe"):
+                self._dataframe = pd.DataFrame(self.columns, columns=COLUMNS)
+        return self._dataframe
+
+    @dataframe.setter
+    def dataframe(self, dataframe) -> None:
+        self.columns = {column: dataframe[column].tolist() for column in COLUMNS}
+        self._dataframe = dataframe
 
     def new(
         self, vulnerability: Vulnerability, likelihood: Likelihood, impact: Impact
     ) -> Risk:
-        name = (
-            vulnerability["name"]
-            + " -> "
-            + likelihood["name"]
-            + " -> "
-            + impact["name"]
-        )
-        self.data[name] = Risk(vulnerability, likelihood, impact)
-        self.dataframe = self.dataframe.append(
-            {
-                "Threat Source": vulnerability["threat_event"]["threat_source"]["name"],
-                "Threat Event": vulnerability["threat_event"]["name"],
-                "System": vulnerability["system"].path(),
-                "Controls": list(map(lambda x: x["name"], vulnerability["controls"])),
-                "Impact": impact["name"],
-                "Impact (mean)": impact["mean"],
-                "Likelihood (mean)": likelihood["lam"],
-            },
-            ignore_index=True,
+        risk = Risk(vulnerability, likelihood, impact)
+        self.data[risk["name"]] = risk
+        self._matrix = None
+        row = (
+            vulnerability["threat_event"]["threat_source"]["name"],
+            vulnerability["threat_event"]["name"],
+            vulnerability["system"].path(),
+            list(map(lambda x: x["name"], vulnerability["controls"])),
+            impact["name"],
+            impact["mean"],
+            likelihood["lam"],
         )
-        return self.data[name]
+        for column, value in zip(self.columns.values(), row):
+            column.append(value)
+        self._dataframe = None
+        return risk
 
-    def calculate_stochastic_risks(self, interations: int = 100000):
-        risks_scores = np.array(
-            list(
-                map(lambda row: row.evaluate_lognormal(interations), self.data.values())
+    def extend(self, records) -> list:
+        """
+        A method to add many risks at once. Each record is a (vulnerability,
+        likelihood, impact) tuple or a dict with those keys.
+        """
+        return [
+            (
+                self.new(
+                    record["vulnerability"], record["likelihood"], record["impact"]
+                )
+                if isinstance(record, dict)
+                else self.new(*record)
             )
+            for record in records
+        ]
+
+    @classmethod
+    def from_records(cls, records) -> "Risks":
+        """
+        A method to create Risks from many (vulnerability, likelihood, impact)
+        records
+        """
+        risks = cls()
+        risks.extend(records)
+        return risks
+
+    def control_matrix(self):
+        """
+        A sparse risk by control matrix counting how many times each control
+        appears in each risk's vulnerability. Its columns are the Control
+        objects in matrix_controls.
+        """
+        if self._matrix is None:
+            with phase("control_matrix"):
+                self._build_control_matrix()
+        return self._matrix
+
+    def _build_control_matrix(self) -> None:
+        from scipy.sparse import csr_matrix
+
+        index = {}
+        self.matrix_controls = []
+        rows, columns = [], []
+        for row, risk in enumerate(self.data.values()):
+            for control in risk["vulnerability"]["controls"]:
+                column = index.setdefault(id(control), len(index))
+                if column == len(self.matrix_controls):
+                    self.matrix_controls.append(control)
+                rows.append(row)
+                columns.append(column)
+        self._matrix = csr_matrix(
+            (np.ones(len(rows)), (rows, columns)),
+            shape=(len(self.data), len(self.matrix_controls)),
+        )
+        self._entries = np.array(columns, dtype=np.int64)
+        self._indptr = np.searchsorted(rows, np.arange(len(self.data) + 1))
+        self._matrix_columns = self._matrix.tocsc()
+        self._versions = self._control_versions()
+        self._reduction = np.exp(self._matrix @ self._log_reduction())
+        self._values = None
+
+    def _control_versions(self) -> np.ndarray:
+        return np.array(
+            [getattr(control, "version", 0) for control in self.matrix_controls],
+            dtype=np.int64,
+        )
+
+    def _log_reduction(self, implemented=None) -> np.ndarray:
+        if implemented is None:
+            implemented = [
+                control["implemented"] is True for control in self.matrix_controls
+            ]
+        reduction = np.array(
+            [control["reduction"] for control in self.matrix_controls], dtype=float
+        )
+        return np.where(
+            implemented, np.log(np.maximum(reduction, np.finfo(float).tiny)), 0
+        )
+
+    def reductions(self, implemented=None) -> np.ndarray:
+        """
+        A method to compute the product of the reductions of the implemented
+        controls for every risk as one sparse matrix-vector product of log
+        reductions. implemented may give a flag for each control in
+        matrix_controls instead of using the controls' own flags. Otherwise
+        only the risks reduced by controls changed since the last call are
+        recomputed, and a copy of the cached reductions is returned.
+        """
+        matrix = self.control_matrix()
+        with phase("reductions"):
+            if implemented is not None:
+                return np.exp(matrix @ self._log_reduction(implemented))
+            versions = self._control_versions()
+            changed = np.flatnonzero(versions != self._versions)
+            if len(changed):
+                rows = np.unique(self._matrix_columns[:, changed].indices)
+                self._reduction[rows] = np.exp(matrix[rows] @ self._log_reduction())
+                self._versions = versions
+            return self._reduction.copy()
+
+    def residual_likelihoods(self, implemented=None) -> np.ndarray:
+        """
+        A method to compute the likelihood of every risk after its controls
+        """
+        lam = np.array(
+            [risk["likelihood"]["lam"] for risk in self.data.values()], dtype=float
         )
-        return risks_scores.sum(axis=0)
-
-    def plot(self, axes=None):
-        plt.title("expected loss")
-        plt.xlabel("loss")
-        plt.ylabel("probability")
-        return plt.hist(
-            self.calculate_stochastic_risks(),
-            histtype="step",
-            bins=10000,
-            cumulative=-1,
-            normed=True,
-            axes=axes,
+        return lam * self.reductions(implemented)
+
+    def _arrays(self) -> tuple:
+        risks = self.data.values()
+        lam = np.array([risk["likelihood"]["lam"] for risk in risks], dtype=float)
+        mu = np.array([risk["impact"]["mu"] for risk in risks], dtype=float)
+        sigma = np.array([risk["impact"]["sigma"] for risk in risks], dtype=float)
+        return lam, mu, sigma, self.reductions()
+
+    def calculate_stochastic_risks(
+        self,
+        interations: int = 100000,
+        chunk_size: int = None,
+        rng=None,
+        sampling: str = "plain",
+    ):
+        """
+        A method to sample the total loss of all risks. Risks are sampled in
+        chunks of chunk_size rows so that at most chunk_size * interations
+        samples are held in memory at once. The sampling is one of "plain",
+        "antithetic", "lhs" or "sobol".
+        """
+        lam, mu, sigma, reduction = self._arrays()
+        with phase("sampling", interations):
+            return total_loss(
+                lam * reduction, mu, sigma, interations, chunk_size, rng, sampling
+            )
+
+    def calculate_importance_risks(
+        self,
+        iterations: int = 100000,
+        frequency_tilt: float = None,
+        severity_shift: float = None,
+        chunk_size: int = None,
+        rng=None,
+        sampling: str = "plain",
+        tail: float = 1e-3,
+        defensive: float = 0.2,
+    ) -> tuple:
+        """
+        A method to sample the total loss of all risks by importance sampling,
+        tilted towards large losses, returning the losses and the weights that
+        correct for the tilt. By default each tilted iteration adds one large
+        impact near the loss exceeded with probability about tail, from a
+        risk chosen by its share of such impacts, and a defensive fraction of
+        the iterations is not tilted, as described in importance_loss.
+        effective_sample_size tells what the weights are worth.
+        """
+        lam, mu, sigma, reduction = self._arrays()
+        with phase("sampling", iterations):
+            return importance_loss(
+                lam * reduction,
+                mu,
+                sigma,
+                iterations,
+                frequency_tilt,
+                severity_shift,
+                chunk_size,
+                rng,
+                sampling,
+                tail,
+                defensive,
+            )
+
+    def loss_histogram(
+        self,
+        iterations: int = 100000,
+        chunk_iterations: int = 65536,
+        bins_per_decade: int = 100,
+        processes: int = None,
+        rng=None,
+        sampling: str = "plain",
+        frequency_tilt: float = 1.0,
+        severity_shift: float = 0.0,
+    ):
+        """
+        A method to sample the total loss of all risks into a LossHistogram,
+        from which the mean, quantiles, value at risk, tail value at risk and
+        exceedance curve are read without keeping every sample. Setting
+        frequency_tilt or severity_shift samples the tail by importance
+        sampling.
+        """
+        lam, mu, sigma, reduction = self._arrays()
+        with phase("sampling", iterations):
+            return loss_histogram(
+                lam * reduction,
+                mu,
+                sigma,
+                iterations,
+                chunk_iterations,
+                bins_per_decade,
+                processes,
+                rng,
+                sampling,
+                frequency_tilt,
+                severity_shift,
+            )
+
+    def estimate_stochastic_risks(
+        self,
+        statistic: str = "mean",
+        q: float = 0.99,
+        rtol: float = 0.01,
+        time_budget: float = None,
+        batch_iterations: int = 65536,
+        max_iterations: int = 10**7,
+        rng=None,
+        sampling: str = "plain",
+    ) -> dict:
+        """
+        A method to sample the total loss of all risks in batches until the
+        statistic is known to within rtol or the time budget runs out,
+        returning its value, precision and the iterations used
+        """
+        lam, mu, sigma, reduction = self._arrays()
+        with phase("sampling"):
+            result = estimate_loss(
+                lam * reduction,
+                mu,
+                sigma,
+                statistic=statistic,
+                q=q,
+                rtol=rtol,
+                time_budget=time_budget,
+                batch_iterations=batch_iterations,
+                max_iterations=max_iterations,
+                rng=rng,
+                sampling=sampling,
+            )
+        count("iterations", result["iterations"])
+        return result
+
+    def aggregate_distribution(
+        self, points: int = 2**18, upper: float = None, tail: float = 1e-6
+    ) -> AggregateDistribution:
+        """
+        A method to compute the distribution of the total loss of all risks
+        without sampling, from which the mean, quantiles, value at risk, tail
+        value at risk and exceedance curve are read
+        """
+        lam, mu, sigma, reduction = self._arrays()
+        with phase("aggregate"):
+            return AggregateDistribution(
+                lam * reduction, mu, sigma, points, upper, tail
+            )
+
+    def plot(self, axes=None, rng=None):
+        from matplotlib import pyplot as plt
+
+        losses, probabilities = self.loss_histogram(rng=rng).exceedance_curve()
+        with style():
+            plt.title("expected loss")
+            plt.xlabel("loss")
+            plt.ylabel("probability")
+            return plt.step(losses, probabilities, where="post", axes=axes)
+
+    def expected_loss_stochastic_mean(
+        self, interations: int = 1000, rng=None, sampling: str = "plain"
+    ) -> float:
+        return (
+            self.calculate_stochastic_risks(
+                interations, rng=rng, sampling=sampling
+            ).sum()
+            / interations
         )
 
-    def expected_loss_stochastic_mean(self, interations: int = 1000) -> float:
-        return self.calculate_stochastic_risks(interations).sum() / interations
+    def deterministic_values(self) -> np.ndarray:
+        """
+        A method to return the deterministic mean loss of every risk. The
+        values are cached with the versions of the controls in
+        matrix_controls, and only the risks reduced by controls changed since
+        the last call are evaluated again. Adding a risk clears the cache.
+        Returns a copy, so the cache cannot be changed through it.
+        """
+        return self._deterministic_values().copy()
+
+    def _deterministic_values(self) -> np.ndarray:
+        self.control_matrix()
+        with phase("deterministic"):
+            versions = self._control_versions()
+            if self._values is None:
+                self._base = np.array(
+                    [
+                        risk["likelihood"]["lam"] * risk["impact"]["mean"]
+                        for risk in self.data.values()
+                    ],
+                    dtype=float,
+                )
+                self._values = np.empty(len(self._base))
+                self._total = 0.0
+                rows = np.arange(len(self._base))
+            else:
+                changed = np.flatnonzero(versions != self._value_versions)
+                rows = np.unique(self._matrix_columns[:, changed].indices)
+            if len(rows):
+                self._values[rows] = self._base[rows] * self._products(rows)
+                self._total = self._values.sum()
+            self._value_versions = versions
+            return self._values
+
+    def _products(self, rows) -> np.ndarray:
+        """
+        The product of the reductions of the implemented controls of each of
+        rows, multiplied in the order of the vulnerability's controls like
+        Risk.reduction
+        """
+        factors = np.array(
+            [
+                control["reduction"] if control["implemented"] is True else 1
+                for control in self.matrix_controls
+            ],
+            dtype=float,
+        )
+        starts = self._indptr[rows]
+        lengths = self._indptr[rows + 1] - starts
+        offsets = np.cumsum(lengths) - lengths
+        entries = self._entries[
+            np.repeat(starts - offsets, lengths) + np.arange(lengths.sum())
+        ]
+        products = np.ones(len(rows))
+        if len(entries):
+            products[lengths > 0] = np.multiply.reduceat(
+                factors[entries], offsets[lengths > 0]
+            )
+        return products
 
     def expected_loss_deterministic_mean(self) -> float:
-        return np.array(
-            list(map(lambda row: row.evaluate_deterministic(), self.data.values()))
-        ).sum()
+        self._deterministic_values()
+        return self._total
 
     def calculate_dataframe_deterministic_mean(self):
         df = self.dataframe.copy()
-        df["Risk (mean)"] = list(
-            map(lambda x: x.evaluate_deterministic(), self.data.values())
-        )
+        df["Risk (mean)"] = self.deterministic_values()
         return df
 
     def determine_optimum_controls(
-        self, controls, controls_to_optimize, stochastic=False
+        self, controls, controls_to_optimize, stochastic=False, rng=None
     ):
-        if not controls_to_optimize:
+        """
+        A method to find the optimum controls by trying every combination.
+        The cost and loss of every combination tried are kept in cost_loss
+        until the next search. Only the optimum is copied into a new
+        Controls, and the implemented flags of controls are restored.
+        """
+        names = list(controls_to_optimize)
+        optimum = self._exhaustive_search(controls, names, stochastic, rng)
+        with phase("deepcopy"):
+            optimum_controls = copy.deepcopy(controls)
+        _implement(optimum_controls, names, optimum["mask"])
+        return {
+            "loss": optimum["loss"],
+            "cost": optimum["cost"],
+            "controls": optimum_controls,
+        }
+
+    def _exhaustive_search(self, controls, names, stochastic, rng):
+        """
+        Try every combination of the named controls, returning the loss, cost
+        and bitmask of the optimum, in which bit i is set if names[i] is
+        implemented. If stochastic, the cost of every control is drawn once and
+        shared by every combination
+        """
+        drawn = controls.draw_costs_lognormal(rng) if stochastic else None
+        self.cost_loss = np.zeros(2 ** len(names), dtype=COST_LOSS)
+        implemented = [controls[name]["implemented"] for name in names]
+        try:
+            with phase("exhaustive"):
+                return self._determine_optimum_controls(
+                    controls, names, len(names), 0, drawn
+                )
+        finally:
+            for name, flag in zip(names, implemented):
+                controls[name]["implemented"] = flag
+
+    def _determine_optimum_controls(self, controls, names, depth, mask, drawn):
+        count("optimizer_nodes")
+        if depth == 0:
             loss = self.expected_loss_deterministic_mean()
-            if stochastic:
-                cost = controls.costs_lognormal()
-            else:
-                cost = controls.costs()
-            self.cost_loss.append({"cost": cost, "loss": loss})
-            return {"loss": loss, "cost": cost, "controls": copy.deepcopy(controls)}
+            cost = controls.costs(drawn)
+            self.cost_loss[mask] = (cost, loss)
+            return {"loss": loss, "cost": cost, "mask": mask}
         else:
-            controls_to_optimize_new_list = list(controls_to_optimize)
-            control = controls_to_optimize_new_list.pop()
-            controls[control]["implemented"] = False
-            control_off = self.determine_optimum_controls(
-                controls, controls_to_optimize_new_list
+            depth -= 1
+            controls[names[depth]]["implemented"] = False
+            control_off = self._determine_optimum_controls(
+                controls, names, depth, mask, drawn
             )
-            controls[control]["implemented"] = True
-            control_on = self.determine_optimum_controls(
-                controls, controls_to_optimize_new_list
+            controls[names[depth]]["implemented"] = True
+            control_on = self._determine_optimum_controls(
+                controls, names, depth, mask | 1 << depth, drawn
             )
             if (
                 control_on["loss"] + control_on["cost"]
@@ -169,37 +544,146 @@ class Risks(UserDict):
                 optimal_control = control_off
             return optimal_control
 
-    def set_optimum_controls(self, controls):
-        optimum_controls = self.determine_optimum_controls(controls, controls)
-        for control in optimum_controls["controls"]:
-            if optimum_controls["controls"][control]["implemented"] is True:
-                controls[control]["implemented"] = True
-            else:
-                controls[control]["implemented"] = False
-        df = pd.DataFrame(list(optimum_controls["controls"].values())).set_index("name")
+    def optimize_controls(
+        self, controls, controls_to_optimize=None, method="branch_and_bound"
+    ):
+        """
+        A method to find the optimum controls without enumerating every
+        combination. Returns the same result as determine_optimum_controls.
+        """
+        return Optimizer(self, controls, controls_to_optimize).solve(method)
+
+    def optimize_controls_within_budget(
+        self, controls, budget, controls_to_optimize=None, method="branch_and_bound"
+    ):
+        """
+        A method to find the controls with the lowest loss whose total cost
+        is at most budget. Returns the loss, cost and controls as
+        optimize_controls does, the marginal_value, the loss saved per unit
+        of extra budget, and exact, which is False unless the portfolio is
+        proven optimal.
+        """
+        return Optimizer(self, controls, controls_to_optimize).solve_budget(
+            budget, method
+        )
+
+    def set_optimum_controls(self, controls, method="exhaustive"):
+        """
+        A method to implement the optimum controls in place, without copying
+        them. Returns a DataFrame of the controls.
+        """
+        import pandas as pd
+
+        names = list(controls)
+        if method == "exhaustive":
+            mask = self._exhaustive_search(controls, names, False, None)["mask"]
+        else:
+            implemented = Optimizer(self, controls).minimize(method)
+            mask = sum(1 << int(i) for i in np.flatnonzero(implemented))
+        _implement(controls, names, mask)
+        df = pd.DataFrame(list(controls.values())).set_index("name")
         return df
 
+    def pareto_frontier(self, controls, controls_to_optimize=None):
+        """
+        A method to find the Pareto frontier of control cost against
+        residual risk, as a DataFrame of the cost, loss and implemented
+        controls of every portfolio that no other beats on both
+        """
+        return Optimizer(self, controls, controls_to_optimize).frontier()
+
     def plot_risk_cost_matrix(self, controls, axes=None):
-        self.set_optimum_controls(controls)
-        df = pd.DataFrame(self.cost_loss)
-        plt.title("residual risk versus control cost")
-        plt.ylabel("residual risk")
-        plt.xlabel("control cost")
-        plt.scatter(df["cost"], df["loss"], axes=axes)
-        plt.scatter(
-            controls.costs(),
-            self.expected_loss_deterministic_mean(),
-            color="red",
-            axes=axes,
-        )
-        axes.set_xlim(xmin=0)
-
-    def sensitivity_test(self, controls, iterations=1000):
-        results = []
-        for i in range(iterations):
-            results.append(
-                self.determine_optimum_controls(controls, controls, stochastic=True)[
-                    "controls"
-                ].values()
+        from matplotlib import pyplot as plt
+
+        frontier = self.pareto_frontier(controls)
+        optimum = frontier.loc[(frontier["cost"] + frontier["loss"]).idxmin()]
+        for name in controls:
+            controls[name]["implemented"] = name in optimum["controls"]
+        with style():
+            plt.title("residual risk versus control cost")
+            plt.ylabel("residual risk")
+            plt.xlabel("control cost")
+            plt.step(frontier["cost"], frontier["loss"], where="post", axes=axes)
+            plt.scatter(frontier["cost"], frontier["loss"], axes=axes)
+            plt.scatter(
+                controls.costs(),
+                self.expected_loss_deterministic_mean(),
+                color="red",
+                axes=axes,
+            )
+            axes.set_xlim(xmin=0)
+
+    def sensitivity_test(self, controls, iterations=1000, processes=None, rng=None):
+        """
+        A method to determine the optimum controls over many stochastic
+        iterations. The result is an array with one row per iteration holding
+        each control's implemented flag (in the order of controls) followed by
+        the cost and the loss. If processes is given, the iterations are
+        spread across a process pool. Every iteration gets its own generator
+        spawned from rng, so results do not depend on the number of
+        processes.
+        """
+        if processes is not None and processes < 1:
+            raise ValueError("processes must be at least 1.")
+        with phase("sensitivity", iterations):
+            return self._sensitivity_test(controls, iterations, processes, rng)
+
+    def _sensitivity_test(self, controls, iterations, processes, rng):
+        rngs = spawn(rng, iterations)
+        if processes is None:
+            return _sensitivity_rows(self, controls, rngs)
+        from concurrent.futures import ProcessPoolExecutor
+
+        chunks = np.array_split(np.arange(iterations), processes * 4)
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_initialize_sensitivity_worker,
+            initargs=(self, controls),
+        ) as executor:
+            results = list(
+                executor.map(
+                    _sensitivity_worker,
+                    [[rngs[i] for i in chunk] for chunk in chunks if len(chunk)],
+                )
             )
-        return results
+        if not results:
+            return np.empty((0, len(controls) + 2))
+        return np.concatenate(results)
+
+
+def _implement(controls, names, mask):
+    """
+    Set the implemented flag of every named control from bit i of mask
+    """
+    for i, name in enumerate(names):
+        controls[name]["implemented"] = bool(mask >> i & 1)
+
+
+_SENSITIVITY_MODEL = {}
+
+
+def _initialize_sensitivity_worker(risks, controls):
+    _SENSITIVITY_MODEL["risks"] = risks
+    _SENSITIVITY_MODEL["controls"] = controls
+
+
+def _sensitivity_worker(rngs):
+    return _sensitivity_rows(
+        _SENSITIVITY_MODEL["risks"], _SENSITIVITY_MODEL["controls"], rngs
+    )
+
+
+def _sensitivity_rows(risks, controls, rngs):
+    """
+    The implemented flags, cost and loss of the optimum controls for stochastic
+    costs drawn with each of rngs
+    """
+    names = list(controls)
+    results = np.empty((len(rngs), len(names) + 2))
+    for row, rng in enumerate(rngs):
+        optimum = risks._exhaustive_search(controls, names, True, rng)
+        results[row, :-2] = [optimum["mask"] >> i & 1 for i in range(len(names))]
+        results[row, -2] = optimum["cost"]
+        results[row, -1] = optimum["loss"]
+        risks.cost_loss = risks.cost_loss[:0]
+    return results
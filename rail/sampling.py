@@ -0,0 +1,362 @@
+"""
+Functions to create random number generators and to sample losses
+"""
+import numpy as np
+
+from .aggregate import _rate_above
+
+CHUNK_ELEMENTS = 2**22
+
+
+def get_rng(rng=None):
+    """
+    A function to create a random number generator from None, a seed, a
+    SeedSequence or an existing Generator. None returns numpy's global
+    RandomState, so numpy.random.seed still applies.
+    """
+    if rng is None:
+        return np.random.mtrand._rand
+    if isinstance(rng, (np.random.Generator, np.random.RandomState)):
+        return rng
+    return np.random.default_rng(rng)
+
+
+def spawn(rng=None, number: int = 1) -> list:
+    """
+    A function to create independent random number generators, for example
+    one per worker process or one per chunk of iterations
+    """
+    if isinstance(rng, np.random.Generator):
+        bit_generator = rng.bit_generator
+        seed_sequence = getattr(bit_generator, "seed_seq", None)
+        if seed_sequence is None:
+            seed_sequence = bit_generator._seed_seq
+    elif isinstance(rng, np.random.SeedSequence):
+        seed_sequence = rng
+    elif rng is None or isinstance(rng, np.random.RandomState):
+        seed_sequence = np.random.SeedSequence(get_rng(rng).randint(0, 2**32, size=4))
+    else:
+        seed_sequence = np.random.SeedSequence(rng)
+    return [np.random.default_rng(child) for child in seed_sequence.spawn(number)]
+
+
+SAMPLING = ["plain", "inverse", "antithetic", "lhs", "sobol"]
+MAX_SOBOL_DIMENSIONS = 21201
+MAX_POISSON_RATE = 700
+
+
+def uniforms(dimensions: int, iterations: int, sampling: str = "plain", rng=None):
+    """
+    A function to draw an array of dimensions by iterations uniforms for
+    inverse CDF sampling. The sampling is "plain" or "inverse" pseudo random
+    numbers, "antithetic" pairs u and 1 - u, "lhs" Latin hypercube samples that put
+    one point in each of iterations strata of every dimension, or "sobol"
+    scrambled Sobol points, which are best balanced when iterations is a
+    power of two.
+    """
+    if sampling not in SAMPLING:
+        raise ValueError("Sampling must be one of %s." % SAMPLING)
+    rng = get_rng(rng)
+    if sampling in ("plain", "inverse"):
+        return rng.random((dimensions, iterations))
+    if sampling == "antithetic":
+        half = rng.random((dimensions, (iterations + 1) // 2))
+        return np.concatenate([half, 1 - half], axis=1)[:, :iterations]
+    if sampling == "lhs":
+        strata = np.argsort(rng.random((dimensions, iterations)), axis=1)
+        return (strata + rng.random((dimensions, iterations))) / iterations
+    import warnings
+
+    from scipy.stats import qmc
+
+    sobol = qmc.Sobol(dimensions, scramble=True, seed=spawn(rng, 1)[0])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        return sobol.random(iterations).T
+
+
+def poisson_ppf(u, lam) -> np.ndarray:
+    """
+    A function to invert the Poisson(lam) CDF at uniforms u, by adding up
+    the probabilities of 0, 1, 2, ... events only for the uniforms not yet
+    reached. It is much faster than scipy.stats.poisson.ppf for the small
+    rates of most risks. Rates so large that exp(-lam) underflows fall back
+    to scipy.
+    """
+    u, lam = np.broadcast_arrays(np.asarray(u, dtype=float), lam)
+    frequency = np.zeros(u.shape)
+    large = lam > MAX_POISSON_RATE
+    if large.any():
+        from scipy.stats import poisson
+
+        frequency[large] = poisson.ppf(u[large], lam[large])
+    remaining = np.flatnonzero((u > 0) & ~large)
+    u, lam = u.ravel()[remaining], lam.ravel()[remaining]
+    pmf = np.exp(-lam)
+    cdf = pmf.copy()
+    count = 0
+    while len(remaining):
+        above = (u > cdf) & (pmf > 0)
+        remaining, u, lam, pmf, cdf = (
+            array[above] for array in (remaining, u, lam, pmf, cdf)
+        )
+        count += 1
+        frequency.flat[remaining] = count
+        pmf *= lam / count
+        cdf += pmf
+    return frequency
+
+
+def compound_loss(frequency, mu, sigma, z=None, rng=None, shift: float = 0.0):
+    """
+    A function to sum an independent lognormal(mu, sigma) impact for every
+    event counted in a risks by iterations array of frequencies, returning
+    the total loss of each iteration and the sum of the standard normals
+    behind its impacts. Only risks and iterations with events draw impacts,
+    so rare risks cost little: one flat array holds the first impact of
+    each, another the impacts of any further events, and np.bincount adds
+    them up per iteration. z, if given, holds a standard normal per risk and
+    iteration for the first event, such as one from stratified uniforms;
+    later events draw plain normals. Log impacts are shifted up by shift
+    standard deviations, either one shift or one per iteration.
+    """
+    frequency = np.atleast_2d(frequency)
+    iterations = frequency.shape[1]
+    row, column, normal = _events(frequency, z, rng)
+    mu = np.broadcast_to(mu, frequency.shape[:1])[row]
+    sigma = np.broadcast_to(sigma, frequency.shape[:1])[row]
+    shift = np.broadcast_to(shift, (iterations,))[column]
+    loss = np.exp(mu + sigma * (normal + shift))
+    return (
+        np.bincount(column, weights=loss, minlength=iterations),
+        np.bincount(column, weights=normal, minlength=iterations),
+    )
+
+
+def total_loss(
+    lam,
+    mu,
+    sigma,
+    iterations: int,
+    chunk_size: int = None,
+    rng=None,
+    sampling: str = "plain",
+) -> np.ndarray:
+    """
+    A function to sample the total loss of many risks, each a Poisson(lam)
+    count of independent lognormal(mu, sigma) impacts. Risks are sampled in
+    chunks of chunk_size so that at most chunk_size * iterations counts are
+    held in memory at once. "plain" sampling draws counts and impacts
+    directly from the generator, which is fastest. Any other sampling draws
+    the counts, and the impact of the first event, of every risk by inverse
+    CDF from uniforms with that sampling; "inverse" uses plain uniforms, for
+    common random numbers.
+    """
+    rng = get_rng(rng)
+    total = np.zeros(iterations)
+    for start, stop, z, frequency in _chunks(
+        lam, iterations, chunk_size, rng, sampling
+    ):
+        total += compound_loss(frequency, mu[start:stop], sigma[start:stop], z, rng)[0]
+    return total
+
+
+def importance_loss(
+    lam,
+    mu,
+    sigma,
+    iterations: int,
+    frequency_tilt: float = None,
+    severity_shift: float = None,
+    chunk_size: int = None,
+    rng=None,
+    sampling: str = "plain",
+    tail: float = 1e-3,
+    defensive: float = 0.2,
+) -> tuple:
+    """
+    A function to sample the total loss of many risks by importance sampling,
+    returning the losses and their likelihood ratio weights, so more samples
+    land in the tail. Weighted by the returned weights, the samples are
+    distributed as those of total_loss. A defensive fraction of the
+    iterations is drawn without any tilt, which keeps every weight below
+    1 / defensive and the effective_sample_size above defensive times the
+    iterations.
+
+    Given frequency_tilt or severity_shift, the tilted iterations draw counts
+    with frequency_tilt times the rate and shift log impacts up by
+    severity_shift standard deviations. Otherwise, since a large total loss
+    of many risks is mostly one large impact, each tilted iteration adds one
+    event to the plain sample: from a risk chosen in proportion to its rate
+    of impacts above the loss exceeded with probability about tail, with its
+    log impact shifted up to that loss. The weights are those of the mixture
+    over risks, so any risk may supply the large impact.
+    """
+    from scipy.special import ndtr
+
+    rng = get_rng(rng)
+    tilted = np.arange(iterations) >= round(defensive * iterations)
+    if frequency_tilt is not None or severity_shift is not None:
+        return _tilted_loss(
+            lam,
+            mu,
+            sigma,
+            tilted,
+            1.0 if frequency_tilt is None else frequency_tilt,
+            0.0 if severity_shift is None else severity_shift,
+            chunk_size,
+            rng,
+            sampling,
+            defensive,
+        )
+    if not lam.sum():
+        return np.zeros(iterations), np.ones(iterations)
+    log_loss = _tail_log_loss(lam, mu, sigma, tail)
+    fixed = sigma == 0
+    scale = np.where(fixed, 1, sigma)
+    shift = np.where(fixed, 0, np.maximum((log_loss - mu) / scale, 0))
+    share = lam * np.where(fixed, mu > log_loss, ndtr((mu - log_loss) / scale))
+    if not share.sum():
+        share = lam
+    share = share / share.sum()
+    factor = np.divide(share, lam, out=np.zeros(len(lam)), where=share > 0)
+    total = np.zeros(iterations)
+    ratio = np.zeros(iterations)
+    for start, stop, z, frequency in _chunks(
+        lam, iterations, chunk_size, rng, sampling
+    ):
+        row, column, normal = _events(frequency, z, rng)
+        row = row + start
+        total += np.bincount(
+            column,
+            weights=np.exp(mu[row] + sigma[row] * normal),
+            minlength=iterations,
+        )
+        ratio += np.bincount(
+            column,
+            weights=factor[row] * np.exp(shift[row] * (normal - shift[row] / 2)),
+            minlength=iterations,
+        )
+    column = np.flatnonzero(tilted)
+    row = rng.choice(len(lam), size=len(column), p=share)
+    normal = rng.standard_normal(len(column)) + shift[row]
+    total[column] += np.exp(mu[row] + sigma[row] * normal)
+    ratio[column] += factor[row] * np.exp(shift[row] * (normal - shift[row] / 2))
+    with np.errstate(over="ignore"):
+        weights = 1 / (defensive + (1 - defensive) * ratio)
+    return total, weights
+
+
+def _tilted_loss(
+    lam,
+    mu,
+    sigma,
+    tilted,
+    frequency_tilt,
+    severity_shift,
+    chunk_size,
+    rng,
+    sampling,
+    defensive,
+) -> tuple:
+    """
+    Sample the total loss with the counts of the tilted iterations drawn with
+    frequency_tilt times the rate and their log impacts shifted up by
+    severity_shift standard deviations, with the weights of the defensive
+    mixture of tilted and plain iterations
+    """
+    tilt = np.where(tilted, frequency_tilt, 1.0)
+    shift = np.where(tilted, severity_shift, 0.0)
+    total = np.zeros(len(tilted))
+    log_ratio = np.full(len(tilted), lam.sum() * (frequency_tilt - 1))
+    for start, stop, z, frequency in _chunks(
+        lam, len(tilted), chunk_size, rng, sampling, tilt
+    ):
+        loss, normals = compound_loss(
+            frequency, mu[start:stop], sigma[start:stop], z, rng, shift
+        )
+        total += loss
+        count = frequency.sum(axis=0)
+        log_ratio -= count * (np.log(frequency_tilt) - severity_shift**2 / 2)
+        log_ratio -= severity_shift * (normals + count * shift)
+    with np.errstate(over="ignore"):
+        weights = 1 / (defensive + (1 - defensive) * np.exp(-log_ratio))
+    return total, weights
+
+
+def _tail_log_loss(lam, mu, sigma, tail: float) -> float:
+    """
+    The log of the loss that single impacts exceed at a rate of tail, found
+    by bisection, or minus infinity if all impacts together are rarer
+    """
+    if lam.sum() <= tail:
+        return -np.inf
+    spread = 10 * np.max(sigma) + 1
+    low, high = np.min(mu) - spread, np.max(mu) + spread
+    for _ in range(60):
+        middle = (low + high) / 2
+        if _rate_above(lam, mu, sigma, middle) > tail:
+            low = middle
+        else:
+            high = middle
+    return high
+
+
+def effective_sample_size(weights) -> float:
+    """
+    A function to compute the number of plain samples that importance
+    sampling weights are worth, (sum w)^2 / sum w^2
+    """
+    weights = np.asarray(weights, dtype=float)
+    return float(weights.sum() ** 2 / max((weights**2).sum(), np.finfo(float).tiny))
+
+
+def _events(frequency, z=None, rng=None) -> tuple:
+    """
+    The risk, iteration and standard normal of every event counted in a
+    risks by iterations array of frequencies. The first event of each risk
+    and iteration takes its normal from z, if given, and later events draw
+    plain normals.
+    """
+    iterations = frequency.shape[1]
+    cells = np.flatnonzero(frequency)
+    counts = frequency.ravel()[cells].astype(np.int64)
+    rng = get_rng(rng)
+    normal = rng.standard_normal(len(cells)) if z is None else np.ravel(z)[cells]
+    repeated = np.repeat(cells, counts - 1)
+    if len(repeated):
+        cells = np.concatenate([cells, repeated])
+        normal = np.concatenate([normal, rng.standard_normal(len(repeated))])
+    row, column = np.divmod(cells, iterations)
+    return row, column, normal
+
+
+def _chunks(lam, iterations: int, chunk_size: int, rng, sampling: str, tilt=None):
+    """
+    Yield the start and stop of each chunk of risks with their Poisson(lam)
+    counts and, unless the sampling is "plain", standard normals for the
+    log impact of their first events. tilt, if given, multiplies the rates
+    of each iteration.
+    """
+    from scipy.special import ndtri
+
+    rng = get_rng(rng)
+    if chunk_size is None:
+        chunk_size = max(1, CHUNK_ELEMENTS // max(iterations, 1))
+    if sampling == "sobol":
+        chunk_size = min(chunk_size, MAX_SOBOL_DIMENSIONS // 2)
+    for start in range(0, len(lam), chunk_size):
+        stop = min(start + chunk_size, len(lam))
+        rate = lam[start:stop, np.newaxis]
+        if tilt is not None:
+            rate = rate * tilt
+        if sampling == "plain":
+            z = None
+            frequency = rng.poisson(lam=rate, size=(stop - start, iterations))
+        else:
+            z, frequency = np.split(
+                uniforms(2 * (stop - start), iterations, sampling, rng), 2
+            )
+            z = ndtri(z)
+            frequency = poisson_ppf(frequency, rate)
+        yield start, stop, z, frequency
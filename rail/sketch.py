@@ -0,0 +1,377 @@
+"""
+A class to summarize sampled losses in bounded memory
+"""
+
+import numpy as np
+
+from .sampling import importance_loss, spawn, total_loss
+
+
+class LossHistogram:
+    """
+    A class to summarize sampled losses in bounded memory
+
+    Positive losses are counted in fixed bins spaced evenly in log10, so
+    quantiles are accurate to a relative error of about
+    10 ** (1 / bins_per_decade) - 1. Zero losses are counted separately.
+    Histograms with the same bins_per_decade merge by adding their bins, so
+    chunks sampled separately or in parallel can be combined. Samples may be
+    weighted, for example by importance sampling likelihood ratios.
+    """
+
+    def __init__(self, bins_per_decade: int = 100) -> None:
+        self.bins_per_decade = bins_per_decade
+        self.samples = 0
+        self.weight = 0.0
+        self.zeros = 0.0
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.minimum = np.inf
+        self.maximum = -np.inf
+        self.offset = 0
+        self.counts = np.zeros(0)
+        self.sums = np.zeros(0)
+
+    def __len__(self) -> int:
+        return self.samples
+
+    def _grow(self, low: int, high: int) -> None:
+        if len(self.counts) == 0:
+            self.offset = low
+        start = min(low, self.offset)
+        stop = max(high + 1, self.offset + len(self.counts))
+        if start < self.offset or stop > self.offset + len(self.counts):
+            counts = np.zeros(stop - start)
+            sums = np.zeros(stop - start)
+            counts[self.offset - start : self.offset - start + len(self.counts)] = (
+                self.counts
+            )
+            sums[self.offset - start : self.offset - start + len(self.sums)] = self.sums
+            self.offset, self.counts, self.sums = start, counts, sums
+
+    def update(self, losses, weights=None) -> "LossHistogram":
+        """
+        A method to add sampled losses to the histogram
+        """
+        losses = np.asarray(losses, dtype=float).ravel()
+        if weights is None:
+            weights = np.ones(len(losses))
+        weights = np.asarray(weights, dtype=float).ravel()
+        if len(losses) == 0:
+            return self
+        self.samples += len(losses)
+        self.weight += weights.sum()
+        self.total += weights @ losses
+        self.total_squares += weights @ losses**2
+        self.minimum = min(self.minimum, losses.min())
+        self.maximum = max(self.maximum, losses.max())
+        positive = losses > 0
+        self.zeros += weights[~positive].sum()
+        if positive.any():
+            index = self._index(losses[positive])
+            self._grow(index.min(), index.max())
+            index -= self.offset
+            self.counts += np.bincount(
+                index, weights=weights[positive], minlength=len(self.counts)
+            )
+            self.sums += np.bincount(
+                index,
+                weights=weights[positive] * losses[positive],
+                minlength=len(self.sums),
+            )
+        return self
+
+    def merge(self, other: "LossHistogram") -> "LossHistogram":
+        """
+        A method to add the bins of another histogram to this one
+        """
+        if other.bins_per_decade != self.bins_per_decade:
+            raise ValueError("Histograms must have the same bins_per_decade.")
+        self.samples += other.samples
+        self.weight += other.weight
+        self.zeros += other.zeros
+        self.total += other.total
+        self.total_squares += other.total_squares
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        if len(other.counts):
+            self._grow(other.offset, other.offset + len(other.counts) - 1)
+            start = other.offset - self.offset
+            self.counts[start : start + len(other.counts)] += other.counts
+            self.sums[start : start + len(other.sums)] += other.sums
+        return self
+
+    def _index(self, losses) -> np.ndarray:
+        return np.floor(np.log10(losses) * self.bins_per_decade).astype(np.int64)
+
+    def edges(self) -> np.ndarray:
+        """
+        A method to return the edges of the positive loss bins
+        """
+        return 10.0 ** (
+            np.arange(self.offset, self.offset + len(self.counts) + 1)
+            / self.bins_per_decade
+        )
+
+    def mean(self) -> float:
+        """
+        A method to return the mean loss
+        """
+        return self.total / self.weight
+
+    def variance(self) -> float:
+        """
+        A method to return the variance of the losses
+        """
+        return max(self.total_squares / self.weight - self.mean() ** 2, 0.0)
+
+    def standard_error(self) -> float:
+        """
+        A method to return the standard error of the mean loss
+        """
+        return np.sqrt(self.variance() / self.samples)
+
+    def quantile(self, q):
+        """
+        A method to return the loss at quantile q, or at an array of quantiles
+        """
+        q = np.asarray(q, dtype=float)
+        target = q * self.weight - self.zeros
+        value = np.zeros(q.shape)
+        if len(self.counts):
+            cumulative = np.cumsum(self.counts)
+            bins = np.minimum(np.searchsorted(cumulative, target), len(self.counts) - 1)
+            previous = cumulative[bins] - self.counts[bins]
+            fraction = np.clip(
+                (target - previous) / np.maximum(self.counts[bins], 1e-300), 0, 1
+            )
+            edges = self.edges()
+            value = edges[bins] * (edges[bins + 1] / edges[bins]) ** fraction
+            value = np.clip(value, self.minimum, self.maximum)
+            value = np.where(target <= 0, 0.0 if self.zeros else self.minimum, value)
+        return value if value.ndim else float(value)
+
+    def value_at_risk(self, q: float = 0.99) -> float:
+        """
+        A method to return the value at risk, the loss at quantile q
+        """
+        return self.quantile(q)
+
+    def tail_value_at_risk(self, q: float = 0.99) -> float:
+        """
+        A method to return the tail value at risk, the mean loss in the worst
+        1 - q of outcomes
+        """
+        var = self.quantile(q)
+        tail = (1 - q) * self.weight
+        if var <= 0:
+            return self.total / tail
+        index = int(np.clip(self._index(var) - self.offset, 0, len(self.counts) - 1))
+        above = self.counts[index + 1 :].sum()
+        losses = self.sums[index + 1 :].sum()
+        if self.counts[index] > 0:
+            losses += min(max(tail - above, 0), self.counts[index]) * (
+                self.sums[index] / self.counts[index]
+            )
+        return losses / tail
+
+    def exceedance(self, loss):
+        """
+        A method to return the probability that the loss exceeds a value, or
+        an array of values
+        """
+        loss = np.asarray(loss, dtype=float)
+        probability = np.zeros(loss.shape)
+        if len(self.counts):
+            edges = self.edges()
+            above = np.append(np.cumsum(self.counts[::-1])[::-1], 0)
+            bins = np.clip(
+                np.searchsorted(edges, loss, side="right") - 1, 0, len(self.counts) - 1
+            )
+            lower, upper = edges[bins], edges[bins + 1]
+            fraction = np.clip(
+                np.log(upper / np.maximum(loss, lower)) / np.log(upper / lower), 0, 1
+            )
+            probability = (above[bins + 1] + fraction * self.counts[bins]) / self.weight
+        probability = np.where(loss < 0, 1.0, probability)
+        return probability if probability.ndim else float(probability)
+
+    def exceedance_curve(self) -> tuple:
+        """
+        A method to return the loss exceedance curve as arrays of losses and
+        the probability that each is exceeded
+        """
+        edges = self.edges()
+        return edges, self.exceedance(edges)
+
+
+def loss_histogram(
+    lam,
+    mu,
+    sigma,
+    iterations: int,
+    chunk_iterations: int = 65536,
+    bins_per_decade: int = 100,
+    processes: int = None,
+    rng=None,
+    sampling: str = "plain",
+    frequency_tilt: float = 1.0,
+    severity_shift: float = 0.0,
+) -> LossHistogram:
+    """
+    A function to sample the total loss of many risks into a LossHistogram,
+    chunk_iterations at a time, so memory does not grow with iterations. Each
+    chunk has its own generator spawned from rng. If processes is given, the
+    chunks are sampled in a process pool and their histograms merged. The
+    sampling is one of "plain", "antithetic", "lhs" or "sobol". A
+    frequency_tilt other than 1 or a severity_shift other than 0 samples by
+    importance sampling, with the likelihood ratios as histogram weights.
+    """
+    sizes = [
+        min(chunk_iterations, iterations - start)
+        for start in range(0, iterations, chunk_iterations)
+    ]
+    options = {
+        "bins_per_decade": bins_per_decade,
+        "sampling": sampling,
+        "frequency_tilt": frequency_tilt,
+        "severity_shift": severity_shift,
+    }
+    chunks = [
+        (size, chunk_rng, options)
+        for size, chunk_rng in zip(sizes, spawn(rng, len(sizes)))
+    ]
+    histogram = LossHistogram(bins_per_decade)
+    if processes is None:
+        results = (_histogram_chunk(lam, mu, sigma, *chunk) for chunk in chunks)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_initialize_worker,
+            initargs=(lam, mu, sigma),
+        )
+        with executor:
+            results = list(executor.map(_histogram_worker, chunks))
+    for result in results:
+        histogram.merge(result)
+    return histogram
+
+
+def _histogram_chunk(lam, mu, sigma, iterations, rng, options):
+    histogram = LossHistogram(options["bins_per_decade"])
+    if options["frequency_tilt"] == 1 and options["severity_shift"] == 0:
+        return histogram.update(
+            total_loss(
+                lam, mu, sigma, iterations, rng=rng, sampling=options["sampling"]
+            )
+        )
+    return histogram.update(
+        *importance_loss(
+            lam,
+            mu,
+            sigma,
+            iterations,
+            options["frequency_tilt"],
+            options["severity_shift"],
+            rng=rng,
+            sampling=options["sampling"],
+        )
+    )
+
+
+_WORKER_RISKS = {}
+
+
+def _initialize_worker(lam, mu, sigma):
+    _WORKER_RISKS.update(lam=lam, mu=mu, sigma=sigma)
+
+
+def _histogram_worker(chunk):
+    return _histogram_chunk(
+        _WORKER_RISKS["lam"], _WORKER_RISKS["mu"], _WORKER_RISKS["sigma"], *chunk
+    )
+
+
+STATISTICS = ["mean", "value_at_risk", "tail_value_at_risk"]
+
+
+def estimate_loss(
+    lam,
+    mu,
+    sigma,
+    statistic: str = "mean",
+    q: float = 0.99,
+    rtol: float = 0.01,
+    time_budget: float = None,
+    batch_iterations: int = 65536,
+    max_iterations: int = 10**7,
+    bins_per_decade: int = 100,
+    rng=None,
+    sampling: str = "plain",
+) -> dict:
+    """
+    A function to sample the total loss of many risks in batches until the
+    95% confidence interval of a statistic is within rtol of its value, the
+    time budget in seconds runs out or max_iterations is reached. The
+    statistic is the "mean", or the "value_at_risk" or "tail_value_at_risk"
+    at quantile q. The value, its relative precision, the iterations used,
+    whether rtol was reached and the LossHistogram are returned.
+    """
+    import time
+
+    if statistic not in STATISTICS:
+        raise ValueError("Statistic must be one of %s." % STATISTICS)
+    start = time.perf_counter()
+    generator = spawn(rng, 1)[0]
+    histogram = LossHistogram(bins_per_decade)
+    batches = []
+    while True:
+        iterations = min(batch_iterations, max_iterations - len(histogram))
+        batch = LossHistogram(bins_per_decade).update(
+            total_loss(lam, mu, sigma, iterations, rng=generator, sampling=sampling)
+        )
+        histogram.merge(batch)
+        if statistic == "tail_value_at_risk":
+            batches.append(batch.tail_value_at_risk(q))
+        value, half_width = _confidence(histogram, statistic, q, batches)
+        if value:
+            precision = half_width / abs(value)
+        else:
+            precision = 0.0 if half_width == 0 else np.inf
+        converged = precision <= rtol
+        if (
+            converged
+            or len(histogram) >= max_iterations
+            or (time_budget is not None and time.perf_counter() - start >= time_budget)
+        ):
+            return {
+                "value": value,
+                "precision": precision,
+                "iterations": len(histogram),
+                "converged": converged,
+                "histogram": histogram,
+            }
+
+
+def _confidence(histogram, statistic, q, batches) -> tuple:
+    """
+    The value of a statistic and the half width of its 95% confidence
+    interval, from the standard error for the mean, the binomial spread of
+    the rank for the value at risk and the spread of the batches for the
+    tail value at risk
+    """
+    z = 1.96
+    if statistic == "mean":
+        return histogram.mean(), z * histogram.standard_error()
+    if statistic == "value_at_risk":
+        spread = z * np.sqrt(q * (1 - q) / len(histogram))
+        low, value, high = histogram.quantile(
+            [max(q - spread, 0), q, min(q + spread, 1)]
+        )
+        return float(value), float(high - low) / 2
+    value = histogram.tail_value_at_risk(q)
+    if len(batches) < 2:
+        return value, np.inf
+    return value, z * np.std(batches, ddof=1) / np.sqrt(len(batches))
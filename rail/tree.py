@@ -7,31 +7,160 @@ from collections import OrderedDict, UserDict
 class Tree(UserDict):  # pylint: disable=too-many-ancestors
     """
     A class to implement a tree structure
+
+    Each node caches its path and its root, and each root keeps an index from
+    path to node, so path and find are O(1). Sorted children are only sorted
+    when they are next iterated, so adding many children is linear even when
+    each is looked up first.
     """
 
     def __init__(self, name: str, parent=None, sort: bool = True) -> None:
+        self._children = OrderedDict()
+        self._unsorted = False
+        self._name = name
         UserDict.__init__(self)
-        self.data = {}
-        self.name = name
-        self.parent = parent
         self.sort = sort
+        self.parent = parent
+
+    @property
+    def data(self) -> OrderedDict:
+        """
+        The children of the tree, sorted by name if sort is set
+        """
+        if self._unsorted:
+            self._children = OrderedDict(
+                sorted(self._children.items(), key=lambda x: x[1].name)
+            )
+            self._unsorted = False
+        return self._children
+
+    @data.setter
+    def data(self, data: dict) -> None:
+        self._children = OrderedDict(data)
+        self._unsorted = bool(getattr(self, "sort", False))
+
+    def __contains__(self, key) -> bool:
+        return key in self._children
+
+    def __getitem__(self, key) -> "Tree":
+        return self._children[key]
+
+    def __setitem__(self, key, item) -> None:
+        if self.sort and self._children and key not in self._children:
+            self._unsorted = True
+        self._children[key] = item
+
+    def __delitem__(self, key) -> None:
+        del self._children[key]
+
+    def __len__(self) -> int:
+        return len(self._children)
+
+    def get(self, key, default=None):
+        return self._children.get(key, default)
+
+    def __copy__(self) -> "Tree":
+        tree = self.__class__.__new__(self.__class__)
+        tree.__dict__.update(self.__dict__)
+        tree._children = OrderedDict(self._children)
+        if self._parent is None:
+            tree._root = tree
+            tree._index = dict(self._index)
+            tree._index[tree.path()] = tree
+        return tree
+
+    def copy(self) -> "Tree":
+        """
+        Return a shallow copy of the tree, which shares its children
+        """
+        return self.__copy__()
+
+    @property
+    def name(self) -> str:
+        """
+        The name of the tree
+        """
+        return self._name
+
+    @name.setter
+    def name(self, name: str) -> None:
+        self._unindex()
+        self._name = name
+        self._reindex()
+
+    @property
+    def parent(self) -> "Tree":
+        """
+        The parent of the tree, or None for a root
+        """
+        return self._parent
+
+    @parent.setter
+    def parent(self, parent: "Tree") -> None:
+        if hasattr(self, "_parent"):
+            self._unindex()
+        self._parent = parent
+        self._reindex()
+
+    def _nodes(self) -> list:
+        nodes = [self]
+        for node in nodes:
+            nodes.extend(node._children.values())
+        return nodes
+
+    def _unindex(self) -> None:
+        index = self.root()._index
+        for node in self._nodes():
+            if index.get(node.path()) is node:
+                del index[node.path()]
+
+    def _reindex(self) -> None:
+        nodes = self._nodes()
+        for node in nodes:
+            node._path = None
+            node._root = None
+        self._index = {} if self._parent is None else None
+        index = self.root()._index
+        for node in nodes:
+            index[node.path()] = node
+
+    def root(self) -> "Tree":
+        """
+        Return the root of the tree
+        """
+        if self._root is None:
+            self._root = self if self._parent is None else self._parent.root()
+        return self._root
+
+    def find(self, path: str) -> "Tree":
+        """
+        Return the node of the tree with a path
+        """
+        return self.root()._index[path]
 
     def add_child(self, name: str) -> "Tree":
         """
         Add a child to the tree
         """
-        self.data[name] = Tree(name=name, parent=self, sort=self.sort)
-        if self.sort:
-            self.data = OrderedDict(sorted(self.data.items(), key=lambda x: x[1].name))
-        return self.data[name]
+        if self.sort and self._children:
+            last = next(reversed(self._children.values()))
+            self._unsorted = self._unsorted or name < last.name
+        if name in self._children:
+            self._children[name]._unindex()
+        child = Tree(name=name, parent=self, sort=self.sort)
+        self._children[name] = child
+        return child
 
     def path(self) -> str:
         """
         Print the path from the root to the child
         """
-        if self.parent:
-            return self.parent.path() + "/" + self.name
-        return "/" + self.name
+        if self._path is None:
+            if self._parent is not None:
+                self._path = self._parent.path() + "/" + self._name
+            else:
+                self._path = "/" + self._name
+        return self._path
 
     def to_print(self) -> None:
         """
@@ -34,6 +34,6 @@ class Vulnerabilities(UserDict):
     def new(
         self, threat_event: ThreatEvent, system: Tree, controls: [Control] = []
     ) -> Vulnerability:
-        name = threat_event["name"] + " -> " + system.path() + " | " + str(controls)
-        self.data[name] = Vulnerability(threat_event, system, controls)
-        return self.data[name]
+        vulnerability = Vulnerability(threat_event, system, controls)
+        self.data[vulnerability["name"]] = vulnerability
+        return vulnerability
@@ -11,6 +11,7 @@ setup(
     url="https://github.com/davidbailey/rail",
     packages=["rail"],
     license="MIT License",
+    python_requires=">=3.9",
     install_requires=["matplotlib", "numpy", "pandas", "scipy"],
     tests_requires=["black", "coveralls", "pytest", "pytest-cov"],
 )
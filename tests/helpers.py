@@ -0,0 +1,43 @@
+"""
+Builders shared by the tests
+"""
+
+import numpy as np
+
+from rail import (
+    Controls,
+    Impact,
+    Likelihood,
+    Risks,
+    ThreatEvent,
+    ThreatSources,
+    Tree,
+    Vulnerability,
+)
+
+
+def build(number_of_controls, number_of_risks, seed=0):
+    """
+    Build Risks and Controls where each risk depends on a few random controls
+    """
+    rng = np.random.RandomState(seed)
+    threat_sources = ThreatSources()
+    threat_event = ThreatEvent("test event", threat_sources.new("test"))
+    system = Tree(name="test tree")
+    controls = Controls()
+    for i in range(number_of_controls):
+        controls.new("control %d" % i, rng.uniform(10, 100), rng.uniform(0.1, 0.9))
+    risks = Risks()
+    for i in range(number_of_risks):
+        chosen = rng.choice(number_of_controls, size=3, replace=False)
+        vulnerability = Vulnerability(
+            threat_event,
+            system.add_child("system %d" % i),
+            [controls["control %d" % j] for j in chosen],
+        )
+        risks.new(
+            vulnerability,
+            Likelihood(rng.uniform(0.1, 2)),
+            Impact("impact %d" % i, rng.uniform(3, 5), 0.5),
+        )
+    return risks, controls
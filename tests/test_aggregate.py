@@ -0,0 +1,118 @@
+"""
+Tests for the AggregateDistribution class
+"""
+
+import unittest
+
+import numpy as np
+
+from rail import AggregateDistribution
+
+
+class TestAggregateDistribution(unittest.TestCase):
+    """
+    Class to test the AggregateDistribution class
+    """
+
+    def setUp(self):
+        self.lam = np.array([2.0, 0.3])
+        self.mu = np.array([0.0, 1.0])
+        self.sigma = np.array([0.5, 1.5])
+        self.distribution = AggregateDistribution(self.lam, self.mu, self.sigma)
+        rng = np.random.default_rng(0)
+        self.losses = np.zeros(200000)
+        for lam, mu, sigma in zip(self.lam, self.mu, self.sigma):
+            counts = rng.poisson(lam, len(self.losses))
+            self.losses += np.bincount(
+                np.repeat(np.arange(len(self.losses)), counts),
+                weights=rng.lognormal(mu, sigma, counts.sum()),
+                minlength=len(self.losses),
+            )
+
+    def test_mean(self):
+        """
+        Test the mean and variance against their exact values
+        """
+        mean = self.lam @ np.exp(self.mu + self.sigma**2 / 2)
+        variance = self.lam @ np.exp(2 * self.mu + 2 * self.sigma**2)
+        self.assertAlmostEqual(self.distribution.mean() / mean, 1, places=7)
+        self.assertAlmostEqual(self.distribution.variance() / variance, 1, places=7)
+
+    def test_quantile(self):
+        """
+        Test quantiles and tail statistics against sampled losses
+        """
+        q = np.array([0.5, 0.9, 0.99])
+        np.testing.assert_allclose(
+            self.distribution.quantile(q), np.quantile(self.losses, q), rtol=0.03
+        )
+        var = np.quantile(self.losses, 0.99)
+        tvar = self.losses[self.losses >= var].mean()
+        self.assertAlmostEqual(self.distribution.value_at_risk() / var, 1, places=1)
+        self.assertAlmostEqual(
+            self.distribution.tail_value_at_risk() / tvar, 1, places=1
+        )
+        for loss in [1, 5, 20]:
+            self.assertAlmostEqual(
+                self.distribution.exceedance(loss), (self.losses > loss).mean(), 2
+            )
+
+    def test_no_loss(self):
+        """
+        Test the probability of no loss and risks that cannot occur
+        """
+        self.assertAlmostEqual(
+            self.distribution.cdf(0), np.exp(-self.lam.sum()), places=5
+        )
+        self.assertEqual(self.distribution.cdf(-1), 0)
+        distribution = AggregateDistribution([0], [0], [1])
+        self.assertEqual(distribution.mean(), 0)
+        self.assertEqual(distribution.quantile(0.99), 0)
+
+    def test_fixed_impact(self):
+        """
+        Test that impacts with a sigma of 0 are a fixed loss
+        """
+        from scipy.stats import poisson
+
+        distribution = AggregateDistribution([1.0], [1.0], [0.0])
+        self.assertAlmostEqual(distribution.mean(), np.e, places=2)
+        self.assertAlmostEqual(distribution.variance(), np.e**2, places=1)
+        for events in range(4):
+            self.assertAlmostEqual(
+                distribution.cdf((events + 0.5) * np.e),
+                poisson.cdf(events, 1),
+                places=5,
+            )
+        distribution = AggregateDistribution([1.0, 0.5], [1.0, 2.0], [0.0, 1.0])
+        self.assertAlmostEqual(
+            distribution.mean() / (np.e + 0.5 * np.exp(2.5)), 1, places=3
+        )
+
+    def test_heavy_tail(self):
+        """
+        Test that a heavy tailed risk does not make the grid too coarse for
+        the losses of the light tailed risks beside it
+        """
+        lam, mu, sigma = [0.5, 2.0], [10.0, 10.0], [4.0, 0.5]
+        distribution = AggregateDistribution(lam, mu, sigma)
+        rng = np.random.default_rng(0)
+        losses = np.zeros(200000)
+        for rate, location, scale in zip(lam, mu, sigma):
+            counts = rng.poisson(rate, len(losses))
+            losses += np.bincount(
+                np.repeat(np.arange(len(losses)), counts),
+                weights=rng.lognormal(location, scale, counts.sum()),
+                minlength=len(losses),
+            )
+        q = np.array([0.2, 0.5, 0.9, 0.99])
+        np.testing.assert_allclose(
+            distribution.quantile(q), np.quantile(losses, q), rtol=0.03
+        )
+        distribution = AggregateDistribution([0.5], [100.0], [10.0])
+        self.assertAlmostEqual(distribution.mean() / (0.5 * np.exp(150)), 1)
+        self.assertGreater(distribution.value_at_risk(), np.exp(100))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,8 @@ Tests for the Control and Controls classes
 """
 import unittest
 
+import numpy as np
+
 from rail import Control, Controls
 
 
@@ -23,6 +25,22 @@ class TestControls(unittest.TestCase):
         self.assertEqual(self.controls["test control"]["cost"], 100)
         self.assertEqual(self.controls["test control"]["reduction"], 0.1)
 
+    def test_evaluate_lognormal(self):
+        """
+        Test sampling a control's cost and reduction
+        """
+        control = self.controls["test control"]
+        plain = control.evaluate_lognormal(64, rng=1)
+        self.assertEqual(plain["cost"].shape, (64,))
+        for sampling in ["antithetic", "lhs", "sobol"]:
+            sample = control.evaluate_lognormal(64, rng=1, sampling=sampling)
+            self.assertEqual(sample["cost"].shape, (64,))
+            self.assertTrue((sample["cost"] > 0).all())
+        np.testing.assert_array_equal(
+            control.evaluate_lognormal(64, rng=1, sampling="lhs")["cost"],
+            control.evaluate_lognormal(64, rng=1, sampling="lhs")["cost"],
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
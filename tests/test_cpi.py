@@ -1,10 +1,22 @@
 """
 Tests for the CPI class
 """
+import os
+import tempfile
 import unittest
 
+import numpy as np
+
 from rail import CPI
 
+BLS = """series_id        \tyear\tperiod\t       value\tfootnote_codes
+CUUR0000SA0      \t2010\tS01\t      100.0\t
+CUUS0000SA0      \t2010\tS01\t      200.0\t
+CUUS0000SA0      \t2010\tS02\t      210.0\t
+CUUS0000SA0      \t2011\tS01\t      220.0\t
+CUUS0000SA0      \t2012\tS01\t      250.0\t
+"""
+
 
 class TestCPI(unittest.TestCase):
     """
@@ -22,5 +34,41 @@ class TestCPI(unittest.TestCase):
         self.assertEqual(self.cpi.inflation(2010, 2018), 1.1496494816926013)
 
 
+class TestCPIOffline(unittest.TestCase):
+    """
+    Class to test a CPI loaded from local files.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cu.data.0.Current")
+        with open(self.path, "w") as bls:
+            bls.write(BLS)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_inflation(self):
+        """
+        Test the inflation calculation from a local BLS file.
+        """
+        cpi = CPI(path=self.path)
+        self.assertEqual(cpi.inflation(2010, 2010), 1.0)
+        self.assertEqual(cpi.inflation(2010, 2012), 1.25)
+        np.testing.assert_array_equal(
+            cpi.inflation([2010, 2011], [2012, 2012]), [1.25, 250 / 220]
+        )
+
+    def test_cache(self):
+        """
+        Test that a cached snapshot is used instead of downloading.
+        """
+        cache = os.path.join(self.directory.name, "cpi.npz")
+        CPI(path=self.path).save(cache)
+        cpi = CPI(cache=cache)
+        self.assertEqual(cpi.inflation(2010, 2011), 1.1)
+        self.assertEqual(len(cpi.cpi), 5)
+
+
 if __name__ == "__main__":
     unittest.main()
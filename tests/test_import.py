@@ -0,0 +1,39 @@
+"""
+Tests for importing the rail package
+"""
+import subprocess
+import sys
+import unittest
+
+IMPORT_TIME_BUDGET = 1.0
+
+SCRIPT = """
+import sys
+import time
+start = time.perf_counter()
+import rail
+print(time.perf_counter() - start)
+print(" ".join(sorted(sys.modules)))
+"""
+
+
+class TestImport(unittest.TestCase):
+    """
+    Class to test importing rail
+    """
+
+    def test_import(self):
+        """
+        Test that importing rail is fast and has no global side effects
+        """
+        output = subprocess.run(
+            [sys.executable, "-c", SCRIPT], capture_output=True, text=True, check=True
+        ).stdout.splitlines()
+        modules = output[1].split()
+        for module in ["matplotlib", "pandas", "scipy.stats", "scipy.sparse"]:
+            self.assertNotIn(module, modules)
+        self.assertLess(float(output[0]), IMPORT_TIME_BUDGET)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+"""
+Tests for loading a register from tables
+"""
+
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from rail import RiskRegister
+from rail.loader import load, load_register
+
+RISKS = pd.DataFrame(
+    {
+        "threat_source": ["source a", "source b", "source b"],
+        "threat_event": ["event a", "event b", "event b"],
+        "system": ["/root/server", "/root/server/disk", "/root"],
+        "impact": ["impact 0", "impact 1", "impact 2"],
+        "lam": [1.0, 2.0, 3.0],
+        "mu": [2.0, 2.0, 2.0],
+        "sigma": [0.5, 0.5, 0.5],
+        "controls": ["firewall", "firewall; backup", None],
+    }
+)
+CONTROLS = pd.DataFrame(
+    {
+        "name": ["firewall", "backup", "unused"],
+        "cost": [10.0, 5.0, 5.0],
+        "reduction": [0.5, 0.8, 0.8],
+    }
+)
+
+
+class TestLoader(unittest.TestCase):
+    """
+    Class to test loading a register from tables
+    """
+
+    def test_load_register(self):
+        """
+        Test building a RiskRegister from DataFrames
+        """
+        register = load_register(RISKS, CONTROLS)
+        self.assertEqual(len(register), 3)
+        self.assertEqual(list(register.control_name), list(CONTROLS["name"]))
+        self.assertEqual(register.incidence.nnz, 3)
+        np.testing.assert_allclose(register.reduction(), [0.5, 0.4, 1])
+        self.assertEqual(list(register.threat_source_name), ["source a", "source b"])
+        self.assertEqual(
+            list(register.system_path[register.system]),
+            list(RISKS["system"]),
+        )
+
+    def test_csv(self):
+        """
+        Test that loading from CSV files matches loading from DataFrames
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            risks = os.path.join(directory, "risks.csv")
+            controls = os.path.join(directory, "controls.csv")
+            RISKS.to_csv(risks, index=False)
+            CONTROLS.to_csv(controls, index=False)
+            register = RiskRegister.from_tables(risks, controls)
+        self.assertEqual(
+            register.expected_loss_deterministic_mean(),
+            load_register(RISKS, CONTROLS).expected_loss_deterministic_mean(),
+        )
+
+    def test_load(self):
+        """
+        Test that the loaded objects give the same losses as the register
+        """
+        model = load(RISKS, CONTROLS)
+        self.assertEqual(len(model["risks"]), 3)
+        self.assertEqual(len(model["controls"]), 3)
+        self.assertEqual(
+            model["systems"]["root"]["server"]["disk"].path(), "/root/server/disk"
+        )
+        self.assertAlmostEqual(
+            model["risks"].expected_loss_deterministic_mean(),
+            load_register(RISKS, CONTROLS).expected_loss_deterministic_mean(),
+        )
+
+    def test_threat_events(self):
+        """
+        Test taking threat sources from a threat events table
+        """
+        threat_events = pd.DataFrame(
+            {"name": ["event b", "event a"], "threat_source": ["b", "a"]}
+        )
+        register = load_register(
+            RISKS.drop(columns="threat_source"), CONTROLS, threat_events
+        )
+        self.assertEqual(list(register.threat_event_name), ["event b", "event a"])
+        self.assertEqual(
+            list(register.threat_source_name[register.threat_event_source]),
+            ["b", "a"],
+        )
+        self.assertEqual(list(register.threat_event), [1, 0, 0])
+
+    def test_unknown(self):
+        """
+        Test that risks referring to undefined names are rejected
+        """
+        with self.assertRaises(KeyError):
+            load_register(RISKS, CONTROLS.iloc[:1])
+        with self.assertRaises(KeyError):
+            load_register(RISKS.drop(columns="threat_source"), CONTROLS)
+
+
+if __name__ == "__main__":
+    unittest.main()
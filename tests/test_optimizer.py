@@ -0,0 +1,187 @@
+"""
+Tests for the Optimizer class
+"""
+import itertools
+import time
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from rail import Optimizer
+
+from helpers import build
+
+
+class TestOptimizer(unittest.TestCase):
+    """
+    Class to test an Optimizer
+    """
+
+    def test_matches_exhaustive(self):
+        """
+        Test that branch and bound finds the exhaustive optimum
+        """
+        for seed in range(3):
+            risks, controls = build(8, 20, seed)
+            expected = risks.determine_optimum_controls(controls, controls)
+            result = risks.optimize_controls(controls)
+            self.assertAlmostEqual(
+                result["loss"] + result["cost"],
+                expected["loss"] + expected["cost"],
+                places=6,
+            )
+            for name in controls:
+                self.assertEqual(
+                    result["controls"][name]["implemented"],
+                    expected["controls"][name]["implemented"],
+                )
+
+    def test_set_optimum_controls(self):
+        """
+        Test that the optimum is implemented in place and that searching
+        leaves the implemented flags as they were
+        """
+        risks, controls = build(8, 20)
+        controls["control 3"]["implemented"] = False
+        expected = risks.determine_optimum_controls(controls, controls)
+        self.assertFalse(controls["control 3"]["implemented"])
+        self.assertTrue(controls["control 4"]["implemented"])
+        for method in ("exhaustive", "branch_and_bound"):
+            df = risks.set_optimum_controls(controls, method)
+            for name in controls:
+                self.assertEqual(
+                    controls[name]["implemented"],
+                    expected["controls"][name]["implemented"],
+                )
+                self.assertEqual(
+                    df.loc[name, "implemented"], controls[name]["implemented"]
+                )
+            self.assertAlmostEqual(
+                risks.expected_loss_deterministic_mean() + controls.costs(),
+                expected["loss"] + expected["cost"],
+            )
+
+    def test_greedy(self):
+        """
+        Test that greedy is never better than branch and bound
+        """
+        risks, controls = build(10, 30)
+        optimizer = Optimizer(risks, controls)
+        exact = optimizer.solve()
+        greedy = optimizer.solve("greedy")
+        self.assertGreaterEqual(
+            greedy["loss"] + greedy["cost"], exact["loss"] + exact["cost"] - 1e-9
+        )
+        with self.assertRaises(ValueError):
+            optimizer.solve("unknown")
+
+    def test_frontier(self):
+        """
+        Test that the frontier holds exactly the exhaustive search's
+        portfolios that no other beats on both cost and loss
+        """
+        for seed in range(3):
+            risks, controls = build(8, 20, seed)
+            risks.determine_optimum_controls(controls, controls)
+            points = sorted((point["cost"], point["loss"]) for point in risks.cost_loss)
+            expected = [
+                point
+                for point in points
+                if not any(
+                    other[0] <= point[0] and other[1] <= point[1] and other != point
+                    for other in points
+                )
+            ]
+            frontier = risks.pareto_frontier(controls)
+            np.testing.assert_allclose(
+                frontier[["cost", "loss"]].to_numpy(), expected, rtol=1e-9
+            )
+            self.assertEqual(len(risks.cost_loss), 2**8)
+            optimizer = Optimizer(risks, controls)
+            for cost, loss, names in frontier.itertuples(index=False):
+                flags = [name in names for name in optimizer.names]
+                np.testing.assert_allclose(optimizer.evaluate(flags), (loss, cost))
+
+    def test_budget(self):
+        """
+        Test that the budget search finds the lowest loss of every portfolio
+        within budget, whether it merges frontiers or searches the tree
+        """
+        for seed in range(3):
+            risks, controls = build(8, 20, seed)
+            optimizer = Optimizer(risks, controls)
+            portfolios = [
+                optimizer.evaluate(flags)
+                for flags in itertools.product([False, True], repeat=8)
+            ]
+            for budget in (0, 50, 150, 300, 1000):
+                expected = min(loss for loss, cost in portfolios if cost <= budget)
+                for frontier_controls in (16, 0):
+                    with mock.patch(
+                        "rail.optimizer.MAX_FRONTIER_CONTROLS", frontier_controls
+                    ):
+                        result = risks.optimize_controls_within_budget(controls, budget)
+                    self.assertLessEqual(result["cost"], budget)
+                    self.assertAlmostEqual(result["loss"], expected, places=6)
+                    self.assertGreaterEqual(result["marginal_value"], 0)
+                    self.assertTrue(result["exact"])
+                greedy = optimizer.solve_budget(budget, "greedy")
+                self.assertLessEqual(greedy["cost"], budget)
+                self.assertGreaterEqual(greedy["loss"], expected - 1e-9)
+        with mock.patch("rail.optimizer.MAX_FRONTIER_CONTROLS", 0):
+            with mock.patch("rail.optimizer.MAX_BUDGET_NODES", 1):
+                result = optimizer.solve_budget(150)
+        self.assertFalse(result["exact"])
+        self.assertLessEqual(result["cost"], 150)
+        controls["control 0"]["implemented"] = True
+        with self.assertRaises(ValueError):
+            Optimizer(risks, controls, ["control 1"]).solve_budget(1)
+
+    def test_budget_negative_costs(self):
+        """
+        Test the budget search when some controls pay back more than they
+        cost, so a portfolio can fit a budget below the fixed costs
+        """
+        for seed in range(3):
+            risks, controls = build(7, 15, seed)
+            for name in ["control 1", "control 4"]:
+                controls[name]["cost"] = -controls[name]["cost"]
+            optimizer = Optimizer(risks, controls)
+            portfolios = [
+                optimizer.evaluate(flags)
+                for flags in itertools.product([False, True], repeat=7)
+            ]
+            lowest = min(cost for loss, cost in portfolios)
+            for budget in (lowest, -20, 0, 50, 150):
+                expected = min(loss for loss, cost in portfolios if cost <= budget)
+                for frontier_controls in (16, 0):
+                    with mock.patch(
+                        "rail.optimizer.MAX_FRONTIER_CONTROLS", frontier_controls
+                    ):
+                        result = optimizer.solve_budget(budget)
+                    self.assertLessEqual(result["cost"], budget)
+                    self.assertAlmostEqual(result["loss"], expected, places=6)
+                    self.assertTrue(result["exact"])
+            with self.assertRaises(ValueError):
+                optimizer.solve_budget(lowest - 1)
+
+    def test_scale(self):
+        """
+        Test that hundreds of controls in independent groups solve quickly
+        """
+        risks, controls = build(4, 10)
+        for group in range(1, 50):
+            group_risks, group_controls = build(4, 10, group)
+            for name, control in group_controls.items():
+                controls["%d %s" % (group, name)] = control
+            for name, risk in group_risks.items():
+                risks["%d %s" % (group, name)] = risk
+        start = time.perf_counter()
+        result = risks.optimize_controls(controls)
+        self.assertLess(time.perf_counter() - start, 10)
+        self.assertEqual(len(result["controls"]), 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+Tests for the Profiler class
+"""
+
+import json
+import unittest
+
+import numpy as np
+
+from rail import Profiler
+from rail.profiling import count, phase
+
+from helpers import build
+
+
+class TestProfiler(unittest.TestCase):
+    """
+    Class to test the Profiler class
+    """
+
+    def test_disabled(self):
+        """
+        Test that phases and counters do nothing without a Profiler
+        """
+        with phase("sampling", 10) as record:
+            self.assertIsNone(record)
+        count("optimizer_nodes")
+        self.assertIs(phase("a"), phase("b"))
+
+    def test_phases(self):
+        """
+        Test recording phases, nested phases and counters
+        """
+        calls = []
+        with Profiler(memory=True, callback=lambda *call: calls.append(call)) as p:
+            with phase("outer", 5):
+                with phase("outer"):
+                    data = np.ones(100000)
+                with phase("inner"):
+                    count("nodes", 2)
+            count("nodes")
+        del data
+        self.assertEqual(p.phases["outer"]["calls"], 1)
+        self.assertEqual(p.phases["outer"]["iterations"], 5)
+        self.assertGreaterEqual(p.phases["outer"]["peak_bytes"], 800000)
+        self.assertGreaterEqual(p.peak_bytes, 800000)
+        self.assertLess(p.phases["inner"]["peak_bytes"], 800000)
+        self.assertEqual(p.counters, {"nodes": 3})
+        self.assertEqual([name for name, _ in calls], ["inner", "outer"])
+        self.assertEqual(json.loads(p.to_json()), p.to_dict())
+
+    def test_risks(self):
+        """
+        Test profiling the evaluation and optimization of Risks
+        """
+        risks, controls = build(4, 10)
+        with Profiler() as profiler:
+            risks.calculate_stochastic_risks(1000, rng=0)
+            risks.determine_optimum_controls(controls, controls)
+            risks.optimize_controls(controls)
+        phases = profiler.to_dict()["phases"]
+        self.assertEqual(phases["sampling"]["iterations"], 1000)
+        self.assertEqual(phases["exhaustive"]["calls"], 1)
+        self.assertEqual(phases["deepcopy"]["calls"], 2)
+        self.assertIn("reductions", phases)
+        self.assertIn("optimizer", phases)
+        self.assertGreater(profiler.counters["optimizer_nodes"], 2**5 - 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+"""
+Tests for the RiskRegister class
+"""
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from rail import (
+    Controls,
+    Impact,
+    Likelihood,
+    RiskRegister,
+    Risks,
+    ThreatEvents,
+    ThreatSources,
+    Tree,
+    Vulnerabilities,
+)
+
+
+class TestRiskRegister(unittest.TestCase):
+    """
+    Class to test a RiskRegister
+    """
+
+    def setUp(self):
+        threat_sources = ThreatSources()
+        threat_events = ThreatEvents()
+        threat_events.new("event a", threat_sources.new("source a"))
+        threat_events.new("event b", threat_sources.new("source b"))
+        system = Tree(name="root")
+        system.add_child("server").add_child("disk")
+        self.controls = Controls()
+        self.controls.new("firewall", 10, 0.5)
+        self.controls.new("backup", 5, 0.8)
+        self.controls.new("unused", 5, 0.8)
+        vulnerabilities = Vulnerabilities()
+        self.risks = Risks()
+        for i, (event, node, names) in enumerate(
+            [
+                ("event a", system["server"], ["firewall"]),
+                ("event b", system["server"]["disk"], ["firewall", "backup"]),
+                ("event b", system, []),
+            ]
+        ):
+            vulnerability = vulnerabilities.new(
+                threat_events[event], node, [self.controls[name] for name in names]
+            )
+            self.risks.new(
+                vulnerability, Likelihood(i + 1), Impact("impact %d" % i, 2, 0.5)
+            )
+        self.register = RiskRegister.from_risks(self.risks, self.controls)
+
+    def test_register(self):
+        """
+        Test the arrays of a RiskRegister
+        """
+        self.assertEqual(len(self.register), 3)
+        self.assertEqual(list(self.register.control_name), list(self.controls))
+        self.assertEqual(self.register.incidence.nnz, 3)
+        self.assertEqual(
+            list(self.register.system_path[self.register.system]),
+            ["/root/server", "/root/server/disk", "/root"],
+        )
+        self.assertLess(self.register.nbytes / len(self.register), 100)
+
+    def test_evaluate(self):
+        """
+        Test evaluating a RiskRegister
+        """
+        self.assertAlmostEqual(
+            self.register.expected_loss_deterministic_mean(),
+            self.risks.expected_loss_deterministic_mean(),
+        )
+        implemented = np.array([False, True, True])
+        self.controls["firewall"]["implemented"] = False
+        self.assertAlmostEqual(
+            self.register.expected_loss_deterministic_mean(implemented),
+            self.risks.expected_loss_deterministic_mean(),
+        )
+        self.assertEqual(self.register.calculate_stochastic_risks(10).shape, (10,))
+
+    def test_to_model(self):
+        """
+        Test converting a RiskRegister back to Risks
+        """
+        model = self.register.to_model()
+        risks = model["risks"]
+        self.assertEqual(len(risks), len(self.risks))
+        self.assertEqual(list(model["controls"]), list(self.controls))
+        self.assertEqual(list(model["systems"]), ["root"])
+        self.assertAlmostEqual(
+            risks.expected_loss_deterministic_mean(),
+            self.risks.expected_loss_deterministic_mean(),
+        )
+        before = risks.expected_loss_deterministic_mean()
+        model["controls"]["firewall"]["implemented"] = False
+        self.assertGreater(risks.expected_loss_deterministic_mean(), before)
+
+    def test_snapshot(self):
+        """
+        Test saving a RiskRegister and loading it with and without memory maps
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            self.register.save(directory)
+            self.assertTrue(os.path.exists(os.path.join(directory, "manifest.json")))
+            for mmap in [True, False]:
+                register = RiskRegister.load(directory, mmap=mmap)
+                self.assertEqual(len(register), 3)
+                self.assertEqual(register.lam.flags.writeable, not mmap)
+                self.assertEqual(
+                    list(register.control_name), list(self.register.control_name)
+                )
+                self.assertEqual((register.incidence != self.register.incidence).nnz, 0)
+                self.assertEqual(
+                    register.expected_loss_deterministic_mean(),
+                    self.register.expected_loss_deterministic_mean(),
+                )
+                model = register.to_model()
+                self.assertEqual(
+                    model["systems"]["root"]["server"]["disk"].path(),
+                    "/root/server/disk",
+                )
+                self.assertAlmostEqual(
+                    model["risks"].expected_loss_deterministic_mean(),
+                    self.risks.expected_loss_deterministic_mean(),
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
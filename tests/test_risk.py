@@ -3,8 +3,11 @@ Tests for the Likelihood class
 """
 import unittest
 
+import numpy as np
+
 from rail import (
     Control,
+    Controls,
     Impact,
     Likelihood,
     Risk,
@@ -40,6 +43,11 @@ class TestRisks(unittest.TestCase):
         self.impact = Impact(NAME, MU, SIGMA)
         self.risks = Risks()
         self.risks.new(self.vulnerability, self.likelihood, self.impact)
+        self.small_risks = Risks()
+        for name in ["a", "b", "c"]:
+            self.small_risks.new(
+                self.vulnerability, Likelihood(2), Impact(name, 0, 0.5)
+            )
 
     def test_risks(self):
         """
@@ -49,6 +57,216 @@ class TestRisks(unittest.TestCase):
             self.risks.expected_loss_deterministic_mean(), 6.968547903331899e63
         )
 
+    def test_dataframe(self):
+        """
+        Test that the dataframe is built from many risks at once
+        """
+        risks = Risks.from_records(
+            [
+                (self.vulnerability, Likelihood(1), Impact("a", 0, 0.5)),
+                {
+                    "vulnerability": self.vulnerability,
+                    "likelihood": Likelihood(2),
+                    "impact": Impact("b", 0, 0.5),
+                },
+            ]
+        )
+        self.assertEqual(len(risks), 2)
+        self.assertEqual(list(risks.dataframe["Likelihood (mean)"]), [1, 2])
+        self.assertEqual(list(risks.dataframe["System"]), ["/test tree"] * 2)
+        risks.new(self.vulnerability, Likelihood(3), Impact("c", 0, 0.5))
+        self.assertEqual(len(risks.calculate_dataframe_deterministic_mean()), 3)
+
+    def test_reductions(self):
+        """
+        Test the sparse risk by control reductions
+        """
+        controls = Controls()
+        controls.new("a", 5, 0.5)
+        controls.new("b", 1, 0.8)
+        risks = Risks()
+        for i, names in enumerate([["a"], ["a", "b"], []]):
+            vulnerability = Vulnerability(
+                self.threat_event, self.system, [controls[name] for name in names]
+            )
+            risks.new(vulnerability, Likelihood(i + 1), Impact(str(i), 0, 0.5))
+        np.testing.assert_allclose(risks.reductions(), [0.5, 0.4, 1])
+        controls["b"]["implemented"] = False
+        np.testing.assert_allclose(risks.reductions(), [0.5, 0.5, 1])
+        risks.reductions()[:] = 0
+        np.testing.assert_allclose(risks.reductions(), [0.5, 0.5, 1])
+        np.testing.assert_allclose(risks.reductions([False, True]), [1, 0.8, 1])
+        np.testing.assert_allclose(
+            risks.residual_likelihoods(),
+            [risk.reduction() * (i + 1) for i, risk in enumerate(risks.values())],
+        )
+
+    def test_deterministic_values(self):
+        """
+        Test that deterministic values are cached until a control changes
+        """
+        from unittest import mock
+
+        controls = Controls()
+        controls.new("a", 5, 0.5)
+        controls.new("b", 1, 0.8)
+        risks = Risks()
+        for i, names in enumerate([["a"], ["b"], []]):
+            vulnerability = Vulnerability(
+                self.threat_event, self.system, [controls[name] for name in names]
+            )
+            risks.new(vulnerability, Likelihood(i + 1), Impact(str(i), 0, 0.5))
+        expected = [risk.evaluate_deterministic() for risk in risks.values()]
+        values = risks.deterministic_values()
+        np.testing.assert_array_equal(values, expected)
+        values[:] = 0
+        np.testing.assert_array_equal(risks.deterministic_values(), expected)
+        with mock.patch.object(
+            Risks, "_products", autospec=True, side_effect=Risks._products
+        ) as products:
+            self.assertEqual(risks.expected_loss_deterministic_mean(), sum(expected))
+            self.assertEqual(products.call_count, 0)
+            controls["b"]["implemented"] = False
+            np.testing.assert_array_equal(
+                risks.deterministic_values(),
+                [risk.evaluate_deterministic() for risk in risks.values()],
+            )
+            self.assertEqual(products.call_count, 1)
+            self.assertEqual(values[1], 0)
+            np.testing.assert_array_equal(products.call_args[0][1], [1])
+        risks.new(self.vulnerability, Likelihood(1), Impact("3", 0, 0.5))
+        self.assertEqual(len(risks.calculate_dataframe_deterministic_mean()), 4)
+
+    def test_calculate_stochastic_risks(self):
+        """
+        Test the chunked stochastic risk calculation
+        """
+        risks = self.small_risks
+        np.random.seed(0)
+        losses = risks.calculate_stochastic_risks(100000, chunk_size=2)
+        self.assertEqual(losses.shape, (100000,))
+        self.assertTrue((losses >= 0).all())
+        self.assertAlmostEqual(
+            losses.mean() / risks.expected_loss_deterministic_mean(), 1, places=1
+        )
+        np.testing.assert_array_equal(
+            risks.calculate_stochastic_risks(1000, rng=2),
+            risks.calculate_stochastic_risks(1000, rng=np.random.default_rng(2)),
+        )
+
+    def test_evaluate_lognormal_sampling(self):
+        """
+        Test sampling one risk with stratified uniforms
+        """
+        risk = Risk(self.vulnerability, Likelihood(2), Impact("a", 0, 0.5))
+        risks = Risks()
+        risks.new(self.vulnerability, Likelihood(2), Impact("a", 0, 0.5))
+        for sampling in ["antithetic", "lhs", "sobol"]:
+            losses = risk.evaluate_lognormal(4096, rng=1, sampling=sampling)
+            self.assertEqual(losses.shape, (4096,))
+            self.assertAlmostEqual(
+                losses.mean() / risk.evaluate_deterministic(), 1, places=1
+            )
+            self.assertAlmostEqual(
+                risks.expected_loss_stochastic_mean(4096, rng=1, sampling=sampling)
+                / risk.evaluate_deterministic(),
+                1,
+                places=1,
+            )
+
+    def test_calculate_importance_risks(self):
+        """
+        Test importance sampling the total loss of all risks
+        """
+        risks = self.small_risks
+        losses, weights = risks.calculate_importance_risks(100000, rng=0)
+        self.assertEqual(losses.shape, weights.shape)
+        self.assertAlmostEqual(
+            (weights @ losses)
+            / weights.sum()
+            / risks.expected_loss_deterministic_mean(),
+            1,
+            places=1,
+        )
+
+    def test_loss_histogram(self):
+        """
+        Test the streaming loss histogram of all risks
+        """
+        risks = self.small_risks
+        histogram = risks.loss_histogram(100000, rng=0)
+        self.assertAlmostEqual(
+            histogram.mean() / risks.expected_loss_deterministic_mean(), 1, places=1
+        )
+        self.assertLess(histogram.value_at_risk(0.5), histogram.value_at_risk(0.99))
+        self.assertLess(histogram.value_at_risk(), histogram.tail_value_at_risk())
+
+    def test_estimate_stochastic_risks(self):
+        """
+        Test the adaptive stochastic risk calculation
+        """
+        risks = self.small_risks
+        result = risks.estimate_stochastic_risks(rtol=0.01, rng=0)
+        self.assertTrue(result["converged"])
+        self.assertAlmostEqual(
+            result["value"] / risks.expected_loss_deterministic_mean(), 1, places=1
+        )
+
+    def test_aggregate_distribution(self):
+        """
+        Test the aggregate loss distribution of all risks
+        """
+        risks = self.small_risks
+        distribution = risks.aggregate_distribution()
+        self.assertAlmostEqual(
+            distribution.mean() / risks.expected_loss_deterministic_mean(), 1, places=3
+        )
+        self.assertAlmostEqual(
+            distribution.cdf(0),
+            np.exp(-risks.residual_likelihoods().sum()),
+            places=4,
+        )
+
+    def test_sensitivity_test_parallel(self):
+        """
+        Test that parallel sensitivity tests are reproducible
+        """
+        controls = Controls()
+        controls.new("a", 5, 0.5)
+        controls.new("b", 1, 0.9)
+        vulnerability = Vulnerability(
+            self.threat_event, self.system, list(controls.values())
+        )
+        risks = Risks()
+        risks.new(vulnerability, Likelihood(2), Impact("small", 2, 0.5))
+        one = risks.sensitivity_test(controls, iterations=20, processes=1, rng=1)
+        two = risks.sensitivity_test(controls, iterations=20, processes=2, rng=1)
+        self.assertEqual(one.shape, (20, 4))
+        np.testing.assert_array_equal(one, two)
+        self.assertGreater(len(np.unique(one[:, 2])), 1)
+        serial = risks.sensitivity_test(controls, iterations=20, rng=1)
+        np.testing.assert_array_equal(serial, one)
+        with self.assertRaises(ValueError):
+            risks.sensitivity_test(controls, iterations=20, processes=0)
+
+    def test_determine_optimum_controls_stochastic(self):
+        """
+        Test that stochastic costs are drawn once and shared by every combination
+        """
+        controls = Controls()
+        controls.new("a", 5, 0.5)
+        controls.new("b", 1, 0.9)
+        vulnerability = Vulnerability(
+            self.threat_event, self.system, list(controls.values())
+        )
+        risks = Risks()
+        risks.new(vulnerability, Likelihood(2), Impact("small", 2, 0.5))
+        risks.determine_optimum_controls(controls, ["a", "b"], True, rng=1)
+        cost = risks.cost_loss["cost"]
+        self.assertEqual(cost[0], 0)
+        self.assertAlmostEqual(cost[3], cost[1] + cost[2])
+        self.assertNotAlmostEqual(cost[1], 5)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,195 @@
+"""
+Tests for the sampling functions
+"""
+
+import unittest
+
+import numpy as np
+
+from rail.sampling import (
+    compound_loss,
+    get_rng,
+    effective_sample_size,
+    importance_loss,
+    poisson_ppf,
+    spawn,
+    total_loss,
+    uniforms,
+)
+
+
+class TestSampling(unittest.TestCase):
+    """
+    Class to test the random number generator functions
+    """
+
+    def test_get_rng(self):
+        """
+        Test creating random number generators
+        """
+        generator = np.random.default_rng(1)
+        self.assertIs(get_rng(generator), generator)
+        self.assertIs(get_rng(), np.random.mtrand._rand)
+        self.assertEqual(get_rng(1).random(), np.random.default_rng(1).random())
+
+    def test_spawn(self):
+        """
+        Test spawning independent random number generators
+        """
+        first, second = spawn(1, 2)
+        self.assertNotEqual(first.random(), second.random())
+        self.assertEqual(spawn(1, 2)[1].random(), spawn(1, 2)[1].random())
+        self.assertEqual(len(spawn(np.random.default_rng(1), 3)), 3)
+        np.random.seed(0)
+        value = spawn(None, 1)[0].random()
+        np.random.seed(0)
+        self.assertEqual(spawn(None, 1)[0].random(), value)
+
+    def test_uniforms(self):
+        """
+        Test the sampling strategies for uniforms
+        """
+        for sampling in ["plain", "inverse", "antithetic", "lhs", "sobol"]:
+            sample = uniforms(3, 64, sampling, rng=1)
+            self.assertEqual(sample.shape, (3, 64))
+            self.assertTrue(((sample >= 0) & (sample < 1)).all())
+            np.testing.assert_array_equal(sample, uniforms(3, 64, sampling, rng=1))
+        sample = uniforms(2, 5, "antithetic", rng=1)
+        np.testing.assert_allclose(sample[:, :2], 1 - sample[:, 3:])
+        for sampling in ["lhs", "sobol"]:
+            strata = np.sort(np.floor(uniforms(3, 64, sampling, rng=1) * 64), axis=1)
+            np.testing.assert_array_equal(strata, np.tile(np.arange(64), (3, 1)))
+        with self.assertRaises(ValueError):
+            uniforms(1, 1, "random")
+
+    def test_total_loss_sampling(self):
+        """
+        Test that every sampling strategy gives the expected mean loss
+        """
+        lam, mu, sigma = np.array([2.0, 0.5]), np.zeros(2), np.array([0.5, 1.0])
+        expected = (lam * np.exp(mu + sigma**2 / 2)).sum()
+        for sampling in ["plain", "inverse", "antithetic", "lhs", "sobol"]:
+            losses = total_loss(lam, mu, sigma, 2**16, rng=1, sampling=sampling)
+            self.assertAlmostEqual(losses.mean() / expected, 1, places=1)
+
+    def test_importance_loss(self):
+        """
+        Test that importance sampling weights correct for the tilt
+        """
+        lam, mu, sigma = np.array([2.0, 0.5]), np.zeros(2), np.array([0.5, 1.0])
+        expected = (lam * np.exp(mu + sigma**2 / 2)).sum()
+        losses, weights = importance_loss(lam, mu, sigma, 2**16, rng=1)
+        plain = total_loss(lam, mu, sigma, 2**16, rng=1)
+        self.assertGreater(losses.mean(), plain.mean())
+        self.assertAlmostEqual(weights.mean(), 1, places=1)
+        self.assertAlmostEqual(
+            (weights @ losses) / weights.sum() / expected, 1, places=1
+        )
+        losses, weights = importance_loss(lam, mu, sigma, 100, 1.0, 0.0, rng=1)
+        np.testing.assert_allclose(weights, 1)
+        self.assertAlmostEqual(effective_sample_size(weights), 100)
+
+    def test_importance_loss_many_risks(self):
+        """
+        Test that importance sampling the total loss of thousands of risks
+        keeps the effective sample size of its defensive fraction, even with
+        a strong tilt
+        """
+        rng = np.random.default_rng(0)
+        lam = rng.uniform(0, 0.1, 2000)
+        mu = rng.uniform(0, 2, 2000)
+        sigma = rng.uniform(0.5, 1.5, 2000)
+        expected = (lam * np.exp(mu + sigma**2 / 2)).sum()
+        plain = total_loss(lam, mu, sigma, 20000, rng=2)
+        losses, weights = importance_loss(lam, mu, sigma, 20000, rng=1)
+        self.assertGreaterEqual(effective_sample_size(weights), 0.2 * 20000)
+        self.assertAlmostEqual(weights.mean(), 1, places=1)
+        self.assertAlmostEqual(
+            (weights @ losses) / weights.sum() / expected, 1, places=1
+        )
+        self.assertGreater(losses.mean(), plain.mean())
+        losses, weights = importance_loss(lam, mu, sigma, 20000, 2.0, 1.0, rng=1)
+        self.assertGreaterEqual(effective_sample_size(weights), 0.2 * 20000)
+        self.assertLessEqual(weights.max(), 1 / 0.2)
+
+    def test_importance_loss_tail(self):
+        """
+        Test that importance sampling estimates the probability of a 1 in
+        1000 loss with less variance than plain sampling
+        """
+        from rail import AggregateDistribution
+
+        rng = np.random.default_rng(0)
+        lam = rng.uniform(0.01, 0.3, 50)
+        mu = rng.uniform(0, 2, 50)
+        sigma = rng.uniform(0.5, 1.5, 50)
+        loss = AggregateDistribution(lam, mu, sigma).quantile(0.999)
+        importance, plain = [], []
+        for seed in range(10):
+            losses, weights = importance_loss(lam, mu, sigma, 20000, rng=seed)
+            importance.append(weights @ (losses > loss) / 20000)
+            plain.append((total_loss(lam, mu, sigma, 20000, rng=seed) > loss).mean())
+        self.assertAlmostEqual(np.mean(importance) / 0.001, 1, places=1)
+        self.assertLess(np.std(importance), np.std(plain) / 4)
+
+    def test_poisson_ppf(self):
+        """
+        Test the Poisson inverse CDF against scipy
+        """
+        from scipy.stats import poisson
+
+        u = np.random.default_rng(1).random(1000)
+        for lam in [0, 0.01, 2, 50, 1000]:
+            np.testing.assert_array_equal(poisson_ppf(u, lam), poisson.ppf(u, lam))
+        self.assertEqual(poisson_ppf(0, 2), 0)
+
+    def test_inverse_sampling(self):
+        """
+        Test that inverse sampling matches the lognormal and Poisson inverse
+        CDFs of the same uniforms where no risk has more than one event
+        """
+        from scipy.stats import lognorm, poisson
+
+        lam, mu, sigma = np.array([2.0, 0.5]), np.array([0, 1.0]), np.array([0.5, 1])
+        severity, frequency = np.split(uniforms(4, 100, rng=1), 2)
+        frequency = poisson.ppf(frequency, lam[:, np.newaxis])
+        expected = (
+            lognorm.ppf(
+                severity, s=sigma[:, np.newaxis], scale=np.exp(mu)[:, np.newaxis]
+            )
+            * frequency
+        ).sum(axis=0)
+        single = (frequency <= 1).all(axis=0)
+        self.assertGreater(single.sum(), 10)
+        np.testing.assert_allclose(
+            total_loss(lam, mu, sigma, 100, rng=1, sampling="inverse")[single],
+            expected[single],
+        )
+
+    def test_compound_loss(self):
+        """
+        Test that every event has its own impact, so the variance is that of
+        a compound Poisson loss, lam E[X^2]
+        """
+        lam, mu, sigma = np.array([3.0, 0.01]), np.zeros(2), np.array([1.0, 0.5])
+        expected = (lam * np.exp(2 * mu + 2 * sigma**2)).sum()
+        for sampling in ["plain", "lhs"]:
+            losses = total_loss(lam, mu, sigma, 2**17, rng=1, sampling=sampling)
+            self.assertAlmostEqual(losses.var() / expected, 1, places=1)
+        frequency = np.array([[0, 2, 1], [0, 0, 1]])
+        loss, normal = compound_loss(frequency, [0, 1], 0, rng=1)
+        np.testing.assert_allclose(loss, [0, 2, 1 + np.e])
+        self.assertEqual(normal[0], 0)
+        sigma = np.array([0.5, 0.5])
+        mean = (lam * np.exp(mu + sigma**2 / 2)).sum()
+        losses, weights = importance_loss(lam, mu, sigma, 2**17, 1.5, 0.5, rng=1)
+        self.assertAlmostEqual(
+            (weights @ losses**2 / weights.sum() - mean**2)
+            / (lam * np.exp(2 * mu + 2 * sigma**2)).sum(),
+            1,
+            places=1,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Tests for the LossHistogram class
+"""
+
+import unittest
+
+import numpy as np
+
+from rail import LossHistogram
+from rail.sketch import estimate_loss, loss_histogram
+
+
+class TestLossHistogram(unittest.TestCase):
+    """
+    Class to test the LossHistogram class
+    """
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.losses = rng.lognormal(0, 1, 100000) * (rng.random(100000) < 0.7)
+        self.histogram = LossHistogram().update(self.losses)
+
+    def test_moments(self):
+        """
+        Test the mean and standard error
+        """
+        self.assertEqual(len(self.histogram), 100000)
+        self.assertAlmostEqual(self.histogram.mean(), self.losses.mean())
+        self.assertAlmostEqual(self.histogram.variance(), self.losses.var())
+        self.assertAlmostEqual(
+            self.histogram.standard_error(), self.losses.std() / np.sqrt(100000)
+        )
+
+    def test_quantile(self):
+        """
+        Test quantiles, value at risk and tail value at risk
+        """
+        q = np.array([0.1, 0.5, 0.9, 0.99])
+        np.testing.assert_allclose(
+            self.histogram.quantile(q), np.quantile(self.losses, q), rtol=0.03
+        )
+        self.assertEqual(self.histogram.quantile(0.1), 0)
+        var = np.quantile(self.losses, 0.99)
+        self.assertAlmostEqual(self.histogram.value_at_risk() / var, 1, places=1)
+        tvar = self.losses[self.losses >= var].mean()
+        self.assertAlmostEqual(self.histogram.tail_value_at_risk() / tvar, 1, places=1)
+
+    def test_exceedance(self):
+        """
+        Test the exceedance probability and curve
+        """
+        for loss in [0.5, 1, 5]:
+            self.assertAlmostEqual(
+                self.histogram.exceedance(loss), (self.losses > loss).mean(), places=2
+            )
+        self.assertEqual(self.histogram.exceedance(-1), 1)
+        losses, probabilities = self.histogram.exceedance_curve()
+        self.assertEqual(losses.shape, probabilities.shape)
+        self.assertTrue((np.diff(probabilities) <= 0).all())
+
+    def test_merge(self):
+        """
+        Test merging histograms of separate chunks
+        """
+        merged = LossHistogram()
+        for chunk in np.array_split(self.losses, 7):
+            merged.merge(LossHistogram().update(chunk))
+        self.assertEqual(len(merged), len(self.histogram))
+        self.assertAlmostEqual(merged.mean(), self.histogram.mean())
+        np.testing.assert_allclose(merged.counts, self.histogram.counts)
+        with self.assertRaises(ValueError):
+            merged.merge(LossHistogram(10))
+
+    def test_weights(self):
+        """
+        Test weighted samples
+        """
+        histogram = LossHistogram().update([1, 10], weights=[3, 1])
+        self.assertAlmostEqual(histogram.mean(), 13 / 4)
+        self.assertAlmostEqual(histogram.exceedance(5), 0.25)
+
+    def test_loss_histogram(self):
+        """
+        Test sampling the total loss in chunks, serially and in parallel
+        """
+        lam, mu, sigma = np.array([2.0, 0.5]), np.zeros(2), np.array([0.5, 1.0])
+        histogram = loss_histogram(lam, mu, sigma, 100000, 30000, rng=1)
+        expected = (lam * np.exp(mu + sigma**2 / 2)).sum()
+        self.assertEqual(len(histogram), 100000)
+        self.assertAlmostEqual(histogram.mean() / expected, 1, places=1)
+        parallel = loss_histogram(lam, mu, sigma, 100000, 30000, processes=2, rng=1)
+        self.assertAlmostEqual(parallel.mean(), histogram.mean())
+        np.testing.assert_allclose(parallel.counts, histogram.counts)
+
+    def test_importance_histogram(self):
+        """
+        Test that importance sampling reweights tilted samples to the same
+        quantiles and exceedance probabilities
+        """
+        lam, mu, sigma = np.array([2.0, 0.5]), np.zeros(2), np.array([0.5, 1.0])
+        plain = loss_histogram(lam, mu, sigma, 200000, rng=1)
+        tilted = loss_histogram(
+            lam, mu, sigma, 50000, rng=1, frequency_tilt=2, severity_shift=1
+        )
+        self.assertAlmostEqual(
+            tilted.exceedance(plain.quantile(0.99)), 0.01, delta=0.002
+        )
+        np.testing.assert_allclose(
+            tilted.quantile([0.5, 0.9, 0.99]),
+            plain.quantile([0.5, 0.9, 0.99]),
+            rtol=0.05,
+        )
+
+    def test_estimate_loss(self):
+        """
+        Test sampling until a statistic converges or the budget runs out
+        """
+        lam, mu, sigma = np.array([2.0, 0.5]), np.zeros(2), np.array([0.5, 1.0])
+        expected = (lam * np.exp(mu + sigma**2 / 2)).sum()
+        result = estimate_loss(lam, mu, sigma, rtol=0.02, rng=1)
+        self.assertTrue(result["converged"])
+        self.assertLessEqual(result["precision"], 0.02)
+        self.assertEqual(result["iterations"], len(result["histogram"]))
+        self.assertAlmostEqual(result["value"] / expected, 1, delta=0.04)
+        for statistic in ["value_at_risk", "tail_value_at_risk"]:
+            result = estimate_loss(lam, mu, sigma, statistic, rtol=0.05, rng=1)
+            self.assertTrue(result["converged"])
+        result = estimate_loss(
+            lam, mu, sigma, rtol=1e-6, batch_iterations=1000, max_iterations=5000
+        )
+        self.assertFalse(result["converged"])
+        self.assertEqual(result["iterations"], 5000)
+        result = estimate_loss(lam, mu, sigma, rtol=1e-6, time_budget=0, rng=1)
+        self.assertEqual(result["iterations"], 65536)
+        with self.assertRaises(ValueError):
+            estimate_loss(lam, mu, sigma, "median")
+
+
+if __name__ == "__main__":
+    unittest.main()
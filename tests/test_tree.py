@@ -31,6 +31,62 @@ class TestTree(unittest.TestCase):
         """
         self.assertEqual(self.tree["test child"].path(), "/test tree/test child")
 
+    def test_find(self):
+        """
+        Test finding nodes of a Tree by path.
+        """
+        child = self.tree["test child"]
+        grandchild = child.add_child("grandchild")
+        self.assertIs(grandchild.find("/test tree/test child/grandchild"), grandchild)
+        self.assertIs(self.tree.find("/test tree"), self.tree)
+        other = Tree(name="other")
+        child.parent = other
+        self.assertEqual(grandchild.path(), "/other/test child/grandchild")
+        self.assertIs(other.find("/other/test child/grandchild"), grandchild)
+        with self.assertRaises(KeyError):
+            self.tree.find("/test tree/test child")
+
+    def test_sort(self):
+        """
+        Test that children are sorted by name.
+        """
+        for name in ["c", "a", "b"]:
+            self.tree.add_child(name)
+        self.assertEqual(list(self.tree), ["a", "b", "c", "test child"])
+        unsorted = Tree(name="unsorted", sort=False)
+        for name in ["c", "a", "b"]:
+            unsorted.add_child(name)
+        self.assertEqual(list(unsorted), ["c", "a", "b"])
+
+    def test_copy(self):
+        """
+        Test that shallow copies share the children but not the mapping
+        """
+        import copy
+
+        for tree in (copy.copy(self.tree), self.tree.copy()):
+            self.assertEqual(list(tree), ["test child"])
+            self.assertIs(tree["test child"], self.tree["test child"])
+            self.assertIs(tree.find("/test tree"), tree)
+            tree.add_child("other")
+            self.assertNotIn("other", self.tree)
+            self.assertIs(self.tree.find("/test tree"), self.tree)
+
+    def test_lookup_does_not_sort(self):
+        """
+        Test that looking children up does not sort them, only iterating
+        """
+        for name in ["c", "a", "b"]:
+            if name not in self.tree:
+                self.tree.add_child(name)
+            self.assertEqual(self.tree[name].name, name)
+            self.assertTrue(self.tree._unsorted)
+        self.assertEqual(len(self.tree), 4)
+        self.assertEqual(list(self.tree.keys()), ["a", "b", "c", "test child"])
+        self.assertFalse(self.tree._unsorted)
+        self.tree["0"] = Tree("0", self.tree)
+        self.assertEqual(list(self.tree)[0], "0")
+
     def test_print(self):
         """
         Test the to_print method of a Tree.